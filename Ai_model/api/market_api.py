@@ -2,11 +2,150 @@
 Market API integration for fetching agricultural market data from data.gov.in
 """
 
-import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-from dateutil.parser import parse
-from config import RAPIDAPI_COMMODITY_SOIL_KEY
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import requests
+from api.session import create_session
+from config import (RAPIDAPI_COMMODITY_SOIL_KEY, MARKET_HISTORY_CACHE_MAX_BYTES,
+                    MARKET_HISTORY_BLOCK_BYTES, API_TIMEOUT)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MARKET_CSV_PATH = os.path.join(DATA_DIR, 'crop_market_history.csv')
+MARKET_PARQUET_PATH = os.path.join(DATA_DIR, 'crop_market_history.parquet')
+MARKET_COLUMNS = ['date', 'crop', 'price_per_ton', 'volume_traded', 'market_location']
+
+# Explicit CSV schema so pandas can skip per-column type inference
+MARKET_DTYPES = {
+    'crop': 'category',
+    'price_per_ton': 'float64',
+    'volume_traded': 'int64',
+    'market_location': 'category'
+}
+
+# The same schema for Arrow's streaming CSV reader
+MARKET_ARROW_TYPES = {
+    'date': pa.timestamp('us'),
+    'crop': pa.string(),
+    'price_per_ton': pa.float64(),
+    'volume_traded': pa.int64(),
+    'market_location': pa.string()
+}
+
+
+def _read_market_csv(csv_path: str) -> pd.DataFrame:
+    """Read the market history CSV using the fixed schema."""
+    return pd.read_csv(csv_path, usecols=MARKET_COLUMNS, dtype=MARKET_DTYPES,
+                       parse_dates=['date'], cache_dates=True)
+
+
+def ensure_parquet(csv_path: str = MARKET_CSV_PATH,
+                   parquet_path: str = MARKET_PARQUET_PATH) -> str:
+    """
+    Convert the market history CSV into a Parquet dataset partitioned by crop.
+    
+    The conversion only runs when the dataset is missing or older than the CSV,
+    so repeated calls are cheap. The CSV is streamed in blocks of
+    MARKET_HISTORY_BLOCK_BYTES, so memory use does not grow with file size.
+    The dataset is written to a temporary directory and renamed into place,
+    so a failed or concurrent conversion never leaves a partial dataset at
+    parquet_path.
+    
+    Args:
+        csv_path: Path to the source CSV file
+        parquet_path: Directory to write the partitioned Parquet dataset to
+        
+    Returns:
+        Path to the Parquet dataset
+    """
+    if (os.path.exists(parquet_path) and
+            os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)):
+        return parquet_path
+    
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=MARKET_HISTORY_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types=MARKET_ARROW_TYPES,
+                                              include_columns=MARKET_COLUMNS)
+    )
+    crop_index = reader.schema.get_field_index('crop')
+    
+    def lowercase_crops(batch: pa.RecordBatch) -> pa.RecordBatch:
+        columns = list(batch.columns)
+        columns[crop_index] = pc.utf8_lower(columns[crop_index])
+        return pa.RecordBatch.from_arrays(columns, schema=batch.schema)
+    
+    parent, name = os.path.split(os.path.abspath(parquet_path))
+    tmp_path = tempfile.mkdtemp(prefix=f'.{name}.', dir=parent)
+    try:
+        ds.write_dataset(map(lowercase_crops, reader), tmp_path, schema=reader.schema,
+                         format='parquet', partitioning=['crop'], partitioning_flavor='hive',
+                         existing_data_behavior='overwrite_or_ignore')
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    
+    # Move any stale dataset aside, then swap the new one in. If another
+    # process swapped its own copy in first, keep that one and drop ours.
+    old_path = tempfile.mkdtemp(prefix=f'.{name}.old.', dir=parent)
+    try:
+        os.replace(parquet_path, old_path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.rename(tmp_path, parquet_path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return parquet_path
+
+
+def _lowercase_categories(crops: pd.Series) -> pd.Series:
+    """
+    Lower-case a categorical Series by rewriting its categories and codes.
+    
+    Only the (few) distinct categories are lower-cased, never the individual
+    rows, and categories that differ only by case are merged.
+    """
+    codes, categories = crops.cat.categories.str.lower().factorize()
+    old_codes = crops.cat.codes.to_numpy()
+    new_codes = np.where(old_codes >= 0, codes[old_codes], -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=categories),
+                     index=crops.index, name=crops.name)
+
+
+@lru_cache(maxsize=1)
+def _load_market_df() -> pd.DataFrame:
+    """
+    Load the market history CSV once per process.
+    
+    Returns:
+        DataFrame with lower-cased categorical crops, indexed by a sorted
+        (crop, date) MultiIndex
+    """
+    df = _read_market_csv(MARKET_CSV_PATH)
+    df['crop'] = _lowercase_categories(df['crop'])
+    return df.set_index(['crop', 'date'], drop=False).sort_index()
+
+
+def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convert a DataFrame into a list of row dictionaries.
+    
+    Columns are converted to Python lists once and zipped together, which
+    avoids the per-row overhead of DataFrame.to_dict('records').
+    """
+    columns = df.columns.tolist()
+    return [dict(zip(columns, row)) for row in zip(*(df[c].tolist() for c in columns))]
 
 class MarketAPI:
     def __init__(self):
@@ -14,6 +153,9 @@ class MarketAPI:
         # Use the commodity/market API key for crop/commodity data
         self.api_key = RAPIDAPI_COMMODITY_SOIL_KEY
         self.base_url = "https://commodity-api-service-url-from-rapidapi.com"  # Replace with actual base URL from RapidAPI docs
+        
+        self._session = create_session()
+        self._session.headers.update({"X-RapidAPI-Key": self.api_key})
 
     def get_market_data(self, state: str, district: str, commodity: str, 
                        start_date: Optional[datetime] = None,
@@ -33,21 +175,8 @@ class MarketAPI:
         """
         # Use sample data for development/testing
         try:
-            # Read from our CSV file instead of calling the API
-            import pandas as pd
-            import os
-            
-            csv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'crop_market_history.csv')
-            df = pd.read_csv(csv_path)
-            
-            # Filter by crop (commodity)
-            df = df[df['crop'].str.lower() == commodity.lower()]
-            
-            if start_date and end_date:
-                df['date'] = pd.to_datetime(df['date'])
-                df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-            
-            records = df.to_dict('records')
+            records = _to_records(self.get_market_frame(state, district, commodity,
+                                                        start_date, end_date))
             
             return {
                 "total": len(records),
@@ -57,33 +186,114 @@ class MarketAPI:
         except Exception as e:
             print(f"Error reading market data: {str(e)}")
             return {"total": 0, "records": []}
+
+    def get_market_frame(self, state: str, district: str, commodity: str,
+                         start_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Get market data for a commodity as a DataFrame.
         
-        try:
-            with open("data/sample_data.json", "r") as f:
-                data = json.load(f)
+        Same filtering as get_market_data, for callers that work on columns
+        and do not need one dictionary per row.
+        
+        Args:
+            state: State name
+            district: District name
+            commodity: Commodity name
+            start_date: Start date for filtering (optional)
+            end_date: End date for filtering (optional)
             
-            # Filter records based on criteria
-            records = data.get("records", [])
-            filtered_records = []
+        Returns:
+            DataFrame with one row per market record
+        """
+        return self._select([commodity], start_date, end_date)
+
+    def get_market_data_bulk(self, state: str, district: str, commodities: List[str],
+                             start_date: Optional[datetime] = None,
+                             end_date: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get market data for several commodities with a single lookup.
+        
+        Args:
+            state: State name
+            district: District name
+            commodities: Commodity names
+            start_date: Start date for filtering (optional)
+            end_date: End date for filtering (optional)
             
-            for record in records:
-                if all(record.get(key) == value for key, value in filters.items() 
-                      if key != "Arrival_Date"):
-                    if "Arrival_Date" in filters:
-                        record_date = parse(record["Arrival_Date"].replace("/", "-"))
-                        if start_date <= record_date <= end_date:
-                            filtered_records.append(record)
-                    else:
-                        filtered_records.append(record)
+        Returns:
+            Dictionary mapping each commodity to its market data records,
+            in the same format as get_market_data (names that differ only
+            by case share one list of records)
+        """
+        results = {c: {"total": 0, "records": []} for c in commodities}
+        
+        try:
+            df = self._select(commodities, start_date, end_date)
             
-            return {
-                "total": len(filtered_records),
-                "records": filtered_records
-            }
+            # Names that differ only by case all get the same records
+            names = {}
+            for c in commodities:
+                names.setdefault(c.lower(), []).append(c)
             
+            for crop, group in df.groupby('crop', sort=False, observed=True):
+                records = _to_records(group)
+                for name in names[crop]:
+                    results[name] = {
+                        "total": len(records),
+                        "records": records
+                    }
         except Exception as e:
-            print(f"Error fetching market data: {str(e)}")
-            return {"total": 0, "records": []}
+            print(f"Error reading market data: {str(e)}")
+        
+        return results
+
+    def _select(self, commodities: List[str],
+                start_date: Optional[datetime],
+                end_date: Optional[datetime]) -> pd.DataFrame:
+        """Select market history rows for the given commodities and date range."""
+        # Small histories are parsed once and served from memory; larger ones
+        # are scanned from the Parquet copy so only matching rows are read.
+        crops = [c.lower() for c in commodities]
+        if os.path.getsize(MARKET_CSV_PATH) <= MARKET_HISTORY_CACHE_MAX_BYTES:
+            return self._filter_cached(crops, start_date, end_date)
+        return self._scan_parquet(crops, start_date, end_date)
+
+    def _filter_cached(self, crops: List[str],
+                       start_date: Optional[datetime],
+                       end_date: Optional[datetime]) -> pd.DataFrame:
+        """Filter the in-memory market history for lower-cased crops and a date range."""
+        df = _load_market_df()
+        crops = [c for c in dict.fromkeys(crops) if c in df.index.levels[0]]
+        if not crops:
+            return df.iloc[:0][MARKET_COLUMNS].reset_index(drop=True)
+        
+        # Binary search on the sorted index instead of scanning boolean masks
+        dates = slice(start_date, end_date) if start_date and end_date else slice(None)
+        return df.loc[(crops, dates), MARKET_COLUMNS].reset_index(drop=True)
+
+    def _scan_parquet(self, crops: List[str],
+                      start_date: Optional[datetime],
+                      end_date: Optional[datetime]) -> pd.DataFrame:
+        """
+        Read matching market history from the Parquet dataset.
+        
+        The crop filter prunes whole partitions and the date filter skips row
+        groups using their min/max statistics.
+        """
+        dataset = ds.dataset(ensure_parquet(MARKET_CSV_PATH, MARKET_PARQUET_PATH),
+                             format='parquet', partitioning='hive')
+        
+        predicate = ds.field('crop').isin(crops)
+        if start_date and end_date:
+            predicate &= ((ds.field('date') >= pd.Timestamp(start_date)) &
+                          (ds.field('date') <= pd.Timestamp(end_date)))
+        
+        # The scan streams record batches and keeps only the matching rows
+        df = dataset.to_table(columns=MARKET_COLUMNS, filter=predicate).to_pandas()
+        
+        # Files are written in parallel, so restore the (crop, date) order
+        return df.sort_values(['crop', 'date'], kind='stable', ignore_index=True)
 
     def get_price_history(self, crop_name: str, 
                          start_date: datetime, 
@@ -102,15 +312,11 @@ class MarketAPI:
         endpoint = f"{self.base_url}/prices/history"
         params = {
             "crop": crop_name,
-            "start": start_date.strftime("%Y-%m-%d"),
-            "end": end_date.strftime("%Y-%m-%d"),
+            "start": f"{start_date.year:04d}-{start_date.month:02d}-{start_date.day:02d}",
+            "end": f"{end_date.year:04d}-{end_date.month:02d}-{end_date.day:02d}",
         }
-        headers = {
-            "X-RapidAPI-Key": self.api_key
-        }
-        
         try:
-            response = requests.get(endpoint, params=params, headers=headers)
+            response = self._session.get(endpoint, params=params, timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -131,12 +337,8 @@ class MarketAPI:
         params = {
             "crop": crop_name
         }
-        headers = {
-            "X-RapidAPI-Key": self.api_key
-        }
-        
         try:
-            response = requests.get(endpoint, params=params, headers=headers)
+            response = self._session.get(endpoint, params=params, timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -157,12 +359,8 @@ class MarketAPI:
         params = {
             "crop": crop_name
         }
-        headers = {
-            "X-RapidAPI-Key": self.api_key
-        }
-        
         try:
-            response = requests.get(endpoint, params=params, headers=headers)
+            response = self._session.get(endpoint, params=params, timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
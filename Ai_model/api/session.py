@@ -0,0 +1,41 @@
+"""
+Shared HTTP session setup for the API clients.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES
+
+def create_session() -> requests.Session:
+    """
+    Create a session with keep-alive pools and bounded retries.
+    
+    Each API client holds one session for its lifetime, so connections stay
+    alive between requests. Each session gets its own adapter, so closing one client never closes
+    another client's connections. Only idempotent reads are retried: on
+    502/503/504 responses up to HTTP_MAX_RETRIES times, and once on a
+    dropped connection. Connection failures are not retried, so a dead host
+    costs a single API_TIMEOUT.
+    
+    Returns:
+        requests.Session with the adapter mounted
+    """
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(
+            total=HTTP_MAX_RETRIES,
+            connect=0,
+            read=1,
+            status=HTTP_MAX_RETRIES,
+            other=0,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            status_forcelist=[502, 503, 504],
+            backoff_factor=0.3
+        )
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
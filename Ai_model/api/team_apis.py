@@ -3,9 +3,16 @@ Integration with internal team APIs.
 """
 
 import requests
+from api.session import create_session
+from utils.concurrency import fetch_concurrently
+from functools import partial
+from urllib.parse import quote
 from typing import Dict, List, Any, Optional
 from datetime import datetime
-from config import RAPIDAPI_COMMODITY_SOIL_KEY, SOIL_API_BASE_URL, CROP_RECOMMEND_API_BASE_URL
+from config import (RAPIDAPI_COMMODITY_SOIL_KEY, SOIL_API_BASE_URL, CROP_RECOMMEND_API_BASE_URL,
+                    LOCATION_API_URL, FARM_SIZE_API_URL, SOIL_TEXTURE_API_URL, DEFAULT_FARM_SIZE,
+                    API_TIMEOUT)
+
 
 class TeamAPI:
     def __init__(self, api_type: str = 'soil'):
@@ -21,6 +28,22 @@ class TeamAPI:
         else:
             raise ValueError("Invalid api_type. Use 'soil' or 'crop_recommend'.")
         self.api_key = RAPIDAPI_COMMODITY_SOIL_KEY
+        
+        self._session = create_session()
+        self._session.headers.update({
+            'Authorization': f'Bearer {self.api_key}',
+            'X-RapidAPI-Key': self.api_key,  # For RapidAPI endpoints
+            'Content-Type': 'application/json'
+        })
+        
+        # Soil lookups run once per field, so the request is prepared once and
+        # only the location is appended per call
+        self._soil_request = self._session.prepare_request(
+            requests.Request('GET', self.api_url + '/soil/')
+        )
+        self._send_settings = self._session.merge_environment_settings(
+            self._soil_request.url, {}, None, None, None
+        )
 
     def _make_request(self, endpoint: str, method: str = 'GET', 
                      params: Dict = None, data: Dict = None) -> Optional[Dict]:
@@ -36,20 +59,11 @@ class TeamAPI:
         Returns:
             Response data or None if request fails
         """
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'X-RapidAPI-Key': self.api_key,  # For RapidAPI endpoints
-            'Content-Type': 'application/json'
-        }
-        
+        # Auth and content-type headers are sent by the session
         try:
-            response = requests.request(
-                method=method,
-                url=f"{self.api_url}{endpoint}",
-                headers=headers,
-                params=params,
-                json=data
-            )
+            response = self._session.request(method, self.api_url + endpoint,
+                                             params=params, json=data,
+                                             timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -66,7 +80,15 @@ class TeamAPI:
         Returns:
             Dictionary containing soil data or None if request fails
         """
-        return self._make_request(f"/soil/{location_id}")
+        request = self._soil_request.copy()
+        request.url += quote(str(location_id))
+        try:
+            response = self._session.send(request, timeout=API_TIMEOUT, **self._send_settings)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"API request failed: {str(e)}")
+            return None
 
     def get_irrigation_data(self, field_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -107,7 +129,7 @@ class TeamAPI:
         Returns:
             Dictionary containing equipment schedule or None if request fails
         """
-        params = {'date': date.strftime("%Y-%m-%d")}
+        params = {'date': f"{date.year:04d}-{date.month:02d}-{date.day:02d}"}
         return self._make_request("/equipment/schedule", params=params)
 
     def report_issue(self, issue_data: Dict[str, Any]) -> bool:
@@ -125,4 +147,49 @@ class TeamAPI:
             method="POST",
             data=issue_data
         )
-        return response is not None
\ No newline at end of file
+        return response is not None
+
+
+class TeamAPIs:
+    def __init__(self):
+        """Initialize the client for the team's location, farm size and soil APIs."""
+        self._session = create_session()
+
+    def _get_json(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a JSON document from one of the team APIs.
+        
+        Args:
+            url: API URL
+            
+        Returns:
+            Response data or None if request fails
+        """
+        try:
+            response = self._session.get(url, timeout=API_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"API request failed: {str(e)}")
+            return None
+
+    def get_all_data(self) -> Dict[str, Any]:
+        """
+        Get the farmer's location, farm size and soil texture.
+        
+        The three APIs are queried concurrently.
+        
+        Returns:
+            Dictionary with 'location', 'farm_size' and 'soil_texture'
+        """
+        responses = fetch_concurrently({
+            'location': partial(self._get_json, LOCATION_API_URL),
+            'farm_size': partial(self._get_json, FARM_SIZE_API_URL),
+            'soil_texture': partial(self._get_json, SOIL_TEXTURE_API_URL)
+        })
+        
+        return {
+            'location': (responses['location'] or {}).get('location'),
+            'farm_size': (responses['farm_size'] or {}).get('farm_size', DEFAULT_FARM_SIZE),
+            'soil_texture': (responses['soil_texture'] or {}).get('soil_texture')
+        }
@@ -2,30 +2,48 @@
 Weather API integration using RapidAPI's OpenWeather service.
 """
 
-import http.client
-import json
-from typing import Dict, Any, Optional
+import time
+import orjson
+import requests
+from api.session import create_session
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-from config import RAPIDAPI_KEY
+from config import RAPIDAPI_KEY, WEATHER_CACHE_TTL, API_TIMEOUT, MODEL_CACHE_MAX_ENTRIES
+
+OPENWEATHER_HOST = "open-weather13.p.rapidapi.com"
 
 class WeatherAPI:
     def __init__(self):
         """Initialize the RapidAPI OpenWeather client."""
         self.headers = {
             'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': "open-weather13.p.rapidapi.com"
+            'x-rapidapi-host': OPENWEATHER_HOST
         }
-        self.conn = None
+        
+        # Only provider-neutral headers go on the session; the RapidAPI
+        # credentials are sent with OpenWeather requests alone
+        self._session = create_session()
+        self._session.headers.update({'Accept': 'application/json'})
+        
+        # Current weather responses keyed by (city, lang) -> (fetch time, data),
+        # oldest first and capped at MODEL_CACHE_MAX_ENTRIES
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+
+    def close(self) -> None:
+        """Release the client's pooled HTTP connections."""
+        self._session.close()
+
+    def __enter__(self) -> 'WeatherAPI':
+        return self
 
-    def _get_connection(self):
-        """Get or create HTTPS connection."""
-        if not self.conn:
-            self.conn = http.client.HTTPSConnection("open-weather13.p.rapidapi.com")
-        return self.conn
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
     def get_current_weather(self, city: str = None, lang: str = "EN") -> Optional[Dict[str, Any]]:
         """
         Get current weather conditions from OpenWeather API via RapidAPI.
+        Responses are cached for WEATHER_CACHE_TTL seconds per city and language,
+        evicting the oldest once MODEL_CACHE_MAX_ENTRIES are held.
         Args:
             city: Name of the city
             lang: Language code (default: EN)
@@ -34,17 +52,22 @@ class WeatherAPI:
         """
         if not city:
             raise ValueError("City name must be provided for real weather data.")
-        conn = self._get_connection()
-        endpoint = f"/weather?city={city}&lang={lang}"
+        key = (city, lang)
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < WEATHER_CACHE_TTL:
+            return cached[1]
         try:
-            conn.request("GET", endpoint, headers=self.headers)
-            res = conn.getresponse()
-            if res.status != 200:
+            response = self._session.get(
+                f"https://{OPENWEATHER_HOST}/weather",
+                params={"city": city, "lang": lang},
+                headers=self.headers,
+                timeout=API_TIMEOUT
+            )
+            if response.status_code != 200:
                 return None
-            data = res.read()
-            weather_json = json.loads(data)
+            weather_json = orjson.loads(response.content)
             # Map OpenWeather API response to expected fields
-            return {
+            weather = {
                 "temperature": weather_json.get("main", {}).get("temp"),
                 "humidity": weather_json.get("main", {}).get("humidity"),
                 "rainfall": weather_json.get("rain", {}).get("1h", 0.0),
@@ -53,6 +76,11 @@ class WeatherAPI:
                 "wind_speed": weather_json.get("wind", {}).get("speed"),
                 "soil_moisture": None  # Not available from OpenWeather
             }
+            self._cache.pop(key, None)
+            self._cache[key] = (time.monotonic(), weather)
+            if len(self._cache) > MODEL_CACHE_MAX_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+            return weather
         except Exception as e:
             print(f"Weather API error: {e}")
             return None
@@ -77,7 +105,7 @@ class WeatherAPI:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
+            response = self._session.get(endpoint, params=params, timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -102,13 +130,13 @@ class WeatherAPI:
         params = {
             "lat": latitude,
             "lon": longitude,
-            "start": start_date.strftime("%Y-%m-%d"),
-            "end": end_date.strftime("%Y-%m-%d"),
+            "start": f"{start_date.year:04d}-{start_date.month:02d}-{start_date.day:02d}",
+            "end": f"{end_date.year:04d}-{end_date.month:02d}-{end_date.day:02d}",
             "api_key": self.api_key
         }
         
         try:
-            response = requests.get(endpoint, params=params)
+            response = self._session.get(endpoint, params=params, timeout=API_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -11,6 +11,14 @@ RAPIDAPI_KEY = "31e1f23e76msha135c97b"
 RAPIDAPI_HOST = "open-weather13.p.rapidapi.com"
 DATA_GOV_API_KEY = "your-data-gov-api-key-here"  # Add your data.gov.in API key here
 
+# Seconds to wait for a remote API to respond before giving up
+API_TIMEOUT = 10
+
+# Connection pool sizes and 5xx retries for idempotent reads, per API client session
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = 32
+HTTP_MAX_RETRIES = 3
+
 # Team API URLs (replace with actual URLs)
 LOCATION_API_URL = "https://your-team-location-api.com"
 FARM_SIZE_API_URL = "https://your-team-farm-size-api.com" 
@@ -22,6 +30,25 @@ SUPPORTED_CROPS = ['wheat', 'rice', 'corn', 'soybeans', 'cotton']
 DEFAULT_FARM_SIZE = 10
 PROFIT_CALCULATION_MONTHS = 6
 
+# Seconds to reuse a city's current weather before fetching it again
+WEATHER_CACHE_TTL = 600
+
+# Seconds the prediction model reuses processed weather and market analysis,
+# and how many entries each of its caches keeps
+PROCESSED_WEATHER_CACHE_TTL = 3600
+MARKET_ANALYSIS_CACHE_TTL = 24 * 3600
+MODEL_CACHE_MAX_ENTRIES = 512
+
+# Market history files up to this size are cached in memory; larger ones are
+# queried from the Parquet copy instead
+MARKET_HISTORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Block size used when streaming the market history CSV into Parquet
+MARKET_HISTORY_BLOCK_BYTES = 256 * 1024 * 1024
+
+# Number of journaled crop database changes before the data file is rewritten
+CROP_JOURNAL_COMPACT_EVERY = 100
+
 # File paths
 MODEL_SAVE_PATH = "models/saved_model.pkl"
 DATA_PATH = "data/"
\ No newline at end of file
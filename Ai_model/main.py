@@ -7,12 +7,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from models.crop_prediction_model import CropPredictionModel
-from api.team_apis import TeamAPIs
-import config
-
 def main():
     """Main application function"""
+    # Imported here so importing this module does not load pandas,
+    # scikit-learn and the HTTP clients
+    from models.crop_prediction_model import CropPredictionModel
+    from api.team_apis import TeamAPIs
+    import config
+    
     print("=== CROP PREDICTION AI SYSTEM ===\n")
     
     # Initialize components
@@ -2,9 +2,40 @@
 Database for storing and retrieving crop characteristics.
 """
 
+from functools import lru_cache
+from tempfile import NamedTemporaryFile
 from typing import Dict, List, Optional
-import json
+import mmap
 import os
+import shutil
+import orjson
+from config import CROP_JOURNAL_COMPACT_EVERY
+
+
+@lru_cache(maxsize=8)
+def _load_crops(path: str, mtime_ns: int, size: int) -> Dict:
+    """
+    Parse a crop data file.
+    
+    Results are cached per (path, modification time, size), so each version of
+    the file is only parsed once per process no matter how many databases
+    are created from it.
+    
+    Args:
+        path: Absolute path to the JSON file
+        mtime_ns: File modification time in nanoseconds
+        size: File size in bytes
+        
+    Returns:
+        Dictionary containing crop data
+    """
+    # An empty file cannot be memory-mapped and is not valid JSON
+    if size == 0:
+        raise orjson.JSONDecodeError("Empty crop data file", "", 0)
+    
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
 
 class CropDatabase:
     def __init__(self, data_file: str = 'data/sample_data.json'):
@@ -15,24 +46,54 @@ class CropDatabase:
             data_file: Path to the JSON file containing crop data
         """
         self.data_file = data_file
+        self.journal_file = os.path.splitext(data_file)[0] + '_journal.jsonl'
+        self._journal_entries = 0
         self.crops_data = self._load_data()
 
     def _load_data(self) -> Dict:
         """
-        Load crop data from JSON file.
+        Load crop data from JSON file and replay any journaled changes.
         
         Returns:
             Dictionary containing crop data
         """
-        if not os.path.exists(self.data_file):
-            return {}
+        crops = {}
+        if os.path.exists(self.data_file):
+            try:
+                stat = os.stat(self.data_file)
+                # Shallow copy so this instance's edits never leak into the shared cache
+                crops = dict(_load_crops(os.path.abspath(self.data_file), stat.st_mtime_ns, stat.st_size))
+            except orjson.JSONDecodeError:
+                print(f"Error reading {self.data_file}")
+                return {}
         
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error reading {self.data_file}")
-            return {}
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # A torn final line from an interrupted append
+                        break
+                    self._apply(crops, entry)
+                    self._journal_entries += 1
+        
+        return crops
+
+    @staticmethod
+    def _apply(crops: Dict, entry: Dict) -> None:
+        """
+        Apply a journal entry to a crop dictionary.
+        
+        Args:
+            crops: Crop data to modify
+            entry: Journal entry with 'op', 'name' and 'info' keys
+        """
+        if entry['op'] == 'add':
+            crops[entry['name']] = entry['info']
+        else:
+            # Replace rather than mutate the entry, which may be shared with the cache
+            crops[entry['name']] = {**crops.get(entry['name'], {}), **entry['info']}
 
     def get_crop_info(self, crop_name: str) -> Optional[Dict]:
         """
@@ -70,7 +131,7 @@ class CropDatabase:
             return False
         
         self.crops_data[crop_name] = crop_info
-        self._save_data()
+        self._append_journal('add', crop_name, crop_info)
         return True
 
     def update_crop(self, crop_name: str, crop_info: Dict) -> bool:
@@ -87,14 +148,58 @@ class CropDatabase:
         if crop_name not in self.crops_data:
             return False
         
-        self.crops_data[crop_name].update(crop_info)
-        self._save_data()
+        self._apply(self.crops_data, {'op': 'update', 'name': crop_name, 'info': crop_info})
+        self._append_journal('update', crop_name, crop_info)
         return True
 
+    def _append_journal(self, op: str, crop_name: str, crop_info: Dict) -> None:
+        """
+        Record a single change in the journal, compacting it when it grows too long.
+        
+        Args:
+            op: Either 'add' or 'update'
+            crop_name: Name of the crop
+            crop_info: Crop information passed to the change
+        """
+        line = orjson.dumps({"op": op, "name": crop_name, "info": crop_info}, option=orjson.OPT_APPEND_NEWLINE)
+        try:
+            fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except Exception as e:
+            print(f"Error saving data: {str(e)}")
+            return
+        
+        self._journal_entries += 1
+        if self._journal_entries >= CROP_JOURNAL_COMPACT_EVERY:
+            self._save_data()
+
     def _save_data(self) -> None:
-        """Save current crop data to JSON file."""
+        """Atomically rewrite the JSON file with current crop data and clear the journal."""
+        tmp_name = None
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.crops_data, f, indent=4)
+            with NamedTemporaryFile('wb', dir=os.path.dirname(os.path.abspath(self.data_file)), delete=False) as tf:
+                tmp_name = tf.name
+                tf.write(orjson.dumps(self.crops_data, option=orjson.OPT_INDENT_2))
+                # The new contents must be on disk before the rename makes them visible
+                tf.flush()
+                os.fsync(tf.fileno())
+            # Temporary files are created 0600; keep the data file's permissions
+            if os.path.exists(self.data_file):
+                shutil.copymode(self.data_file, tmp_name)
+            else:
+                os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, self.data_file)
+            tmp_name = None
+            open(self.journal_file, 'wb').close()
+            self._journal_entries = 0
         except Exception as e:
-            print(f"Error saving data: {str(e)}")
\ No newline at end of file
+            print(f"Error saving data: {str(e)}")
+        finally:
+            if tmp_name is not None:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
\ No newline at end of file
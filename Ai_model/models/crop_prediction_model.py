@@ -2,20 +2,132 @@
 Advanced crop prediction model with integrated weather and market data analysis.
 """
 
+import time
 import numpy as np
-import pandas as pd
+import orjson
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error, r2_score
-from typing import Dict, List, Tuple, Any
+from functools import partial
+from typing import Dict, List, Tuple, Any, Optional
 from datetime import datetime, timedelta
 
 from api.weather_api import WeatherAPI
 from api.market_api import MarketAPI
-from utils.data_processor import DataProcessor
+from utils.data_processor import DataProcessor, WEATHER_FEATURES, linear_slope
 from utils.profit_calculator import ProfitCalculator
+from utils.concurrency import fetch_concurrently
+from config import PROCESSED_WEATHER_CACHE_TTL, MARKET_ANALYSIS_CACHE_TTL, MODEL_CACHE_MAX_ENTRIES
+
+# RAPIDS Forest Inference is optional; without it the scikit-learn forests are used directly
+try:
+    from cuml import ForestInference
+except ImportError:
+    ForestInference = None
+
+def _flatten_forest(forest: RandomForestRegressor) -> Dict[str, Any]:
+    """
+    Concatenate the trees of a fitted regression forest into flat node arrays.
+    
+    Args:
+        forest: Fitted RandomForestRegressor
+        
+    Returns:
+        Dictionary with each tree's root node and the children, split,
+        missing-value routing and leaf value arrays of all nodes, indexed
+        globally; leaf values have one column per output
+    """
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+    return {
+        # Where scikit-learn sends a NaN feature at each split (only recorded
+        # by scikit-learn >= 1.3; older versions reject NaN input)
+        'missing_left': np.concatenate([
+            getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=np.uint8)).astype(bool)
+            for t in trees
+        ]),
+        'roots': roots,
+        'left': np.concatenate([np.where(t.children_left >= 0, t.children_left + r, -1)
+                                for t, r in zip(trees, roots)]),
+        'right': np.concatenate([t.children_right + r for t, r in zip(trees, roots)]),
+        'feature': np.concatenate([t.feature for t in trees]),
+        'threshold': np.concatenate([t.threshold for t in trees]),
+        'value': np.concatenate([t.value[:, :, 0] for t in trees]),
+        'depth': max(tree.max_depth for tree in trees)
+    }
+
+def _autoregress(flat: Dict[str, Any], x0: np.ndarray, steps: int,
+                 price_mean: float, price_scale: float,
+                 output: int = 0, lag_output: int = 0) -> np.ndarray:
+    """
+    Roll a flattened forest forward, feeding each predicted price back in as the last feature.
+    
+    All trees are walked together, one level per NumPy step, so each
+    prediction costs at most `depth` vectorized lookups. In a multi-output
+    forest the last feature is one crop's lagged price, so that crop's
+    prediction is fed back while another crop's output can be read.
+    
+    Args:
+        flat: Forest from _flatten_forest
+        x0: Scaled starting feature row
+        steps: Number of periods to predict
+        price_mean: Scaler mean of the price feature
+        price_scale: Scaler scale of the price feature
+        output: Output column to return
+        lag_output: Output column whose price is the last feature
+        
+    Returns:
+        Array of predicted prices
+    """
+    left, right, missing_left = flat['left'], flat['right'], flat['missing_left']
+    feature, threshold, value = flat['feature'], flat['threshold'], flat['value']
+    
+    # Trees split on float32 inputs
+    x = np.array(x0, dtype=np.float32)
+    prices = np.empty(steps, dtype=np.float64)
+    for step in range(steps):
+        node = flat['roots']
+        for _ in range(flat['depth']):
+            children = left[node]
+            internal = children >= 0
+            if not internal.any():
+                break
+            split_values = x[feature[node]]
+            # NaN compares false, so it follows the split's missing-value routing
+            go_left = np.where(np.isnan(split_values), missing_left[node],
+                               split_values <= threshold[node])
+            node = np.where(internal, np.where(go_left, children, right[node]), node)
+        leaf_values = value[node].mean(axis=0)
+        prices[step] = leaf_values[output]
+        x[-1] = (leaf_values[lag_output] - price_mean) / price_scale
+    return prices
+
+def prediction_to_json(prediction: Dict[str, Any]) -> bytes:
+    """
+    Serialize a comprehensive prediction to JSON.
+    
+    Forecast prices stay NumPy arrays in the prediction and are written
+    directly, without converting them to lists of Python floats first.
+    
+    Args:
+        prediction: Result of CropPredictionModel.get_comprehensive_prediction
+        
+    Returns:
+        UTF-8 encoded JSON
+    """
+    # Seasonal patterns are keyed by month number
+    return orjson.dumps(prediction, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
 
 class CropPredictionModel:
+    # Per-hectare input costs assumed for every crop in a comprehensive prediction
+    _DEFAULT_INPUT_COSTS = {
+        'seeds': 100,
+        'fertilizer': 200,
+        'irrigation': 150,
+        'labor': 300,
+        'equipment': 250
+    }
+
     def __init__(self):
         """Initialize the crop prediction model with integrated APIs and advanced analytics."""
         # Initialize API clients
@@ -28,24 +140,66 @@ class CropPredictionModel:
         self.crop_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
-            random_state=42
+            random_state=42,
+            n_jobs=-1
         )
         
-        # Price prediction model (for each crop)
+        # Price prediction model (for each crop); crops trained together share
+        # one multi-output forest and read their own output column, while the
+        # last feature is the lagged price of the model's lag crop
         self.price_models = {}
+        self._crop_col = {}
+        self._lag_col = {}
         
         # Feature scaling
-        self.crop_scaler = StandardScaler()
+        # Scalers standardize in place during training; preprocess_* always copies
+        self.crop_scaler = StandardScaler(copy=False, with_mean=True, with_std=True)
         self.price_scalers = {}
         
+        # Compiled copies of the trained forests (None when FIL is unavailable)
+        self._fil_crop = None
+        self._fil_price = {}
+        
+        # Flattened price forests for the scikit-learn forecast path
+        self._flat_price = {}
+        
+        # Training R² of each price model, reported as forecast confidence
+        self._price_r2 = {}
+        
+        # Fitted price scaler parameters as float32 arrays, so preprocessing
+        # is a subtract and a multiply without scikit-learn's validation
+        self._price_mean = {}
+        self._price_inv_scale = {}
+        
+        # Feature importances averaged over the trees once, at training time
+        self._crop_feature_importance = None
+        self._price_feature_importance = {}
+        
         # Training status
         self.is_crop_model_trained = False
         self.trained_crops = set()
         
-        # Cache for API data
+        # Bounded caches: key -> (fetch time, data), oldest first. Processed
+        # weather is kept as one WEATHER_FEATURES row per city.
         self.weather_cache = {}
         self.market_cache = {}
 
+    @staticmethod
+    def _as_f32(X: np.ndarray, copy: bool = False) -> np.ndarray:
+        """
+        Convert features to a C-contiguous float32 array, the dtype the forests use internally.
+        
+        Args:
+            X: Input features
+            copy: Always return a new array, even if X is already float32
+            
+        Returns:
+            float32 feature array
+        """
+        if copy:
+            return np.array(X, dtype=np.float32, order='C')
+        return np.ascontiguousarray(X, dtype=np.float32)
+
     def preprocess_crop_data(self, data: np.ndarray) -> np.ndarray:
         """
         Preprocess data for crop selection model.
@@ -56,7 +210,8 @@ class CropPredictionModel:
         Returns:
             Preprocessed features
         """
-        return self.crop_scaler.transform(data)
+        # The float32 conversion is the only copy; the caller's array is never modified
+        return self.crop_scaler.transform(self._as_f32(data, copy=True), copy=False)
 
     def preprocess_price_data(self, data: np.ndarray, crop: str) -> np.ndarray:
         """
@@ -69,74 +224,190 @@ class CropPredictionModel:
         Returns:
             Preprocessed features
         """
-        if crop not in self.price_scalers:
+        if crop not in self._price_mean:
             raise ValueError(f"No price model trained for crop: {crop}")
-        return self.price_scalers[crop].transform(data)
+        # The subtraction allocates the result, so the caller's array is never modified
+        return (self._as_f32(data) - self._price_mean[crop]) * self._price_inv_scale[crop]
 
     def train_crop_model(self, X: np.ndarray, y: np.ndarray) -> None:
         """
         Train the crop selection model.
         
+        X is converted to a contiguous float32 array, which the forest uses
+        internally anyway, and scaled in place. A float32 X is modified.
+        
         Args:
             X: Training features (weather, soil, current market conditions)
             y: Target labels (optimal crops)
         """
         # Scale the features
-        X_scaled = self.crop_scaler.fit_transform(X)
+        X_scaled = self.crop_scaler.fit_transform(self._as_f32(X))
         
         # Train the model
         self.crop_model.fit(X_scaled, y)
         self.is_crop_model_trained = True
+        self._fil_crop = self._compile_model(self.crop_model, is_classifier=True,
+                                             batch_size=len(X_scaled))
+        self._crop_feature_importance = self.crop_model.feature_importances_.copy()
 
     def train_price_model(self, X: np.ndarray, y: np.ndarray, crop: str) -> None:
         """
         Train price prediction model for a specific crop.
         
+        X is converted to a contiguous float32 array and scaled in place, as in
+        train_crop_model.
+        
         Args:
             X: Training features (time series features)
             y: Target values (future prices)
             crop: Crop name
         """
-        if crop not in self.price_models:
-            self.price_models[crop] = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42
-            )
-            self.price_scalers[crop] = StandardScaler()
+        self.train_price_model_multi(X, np.asarray(y).reshape(-1, 1), [crop])
 
+    def train_price_model_multi(self, X: np.ndarray, Y: np.ndarray, crops: List[str],
+                                lag_crop: Optional[str] = None) -> None:
+        """
+        Train one multi-output price model for several crops sharing the same features.
+        
+        A single forest traversal then predicts every crop's price. X is
+        converted to a contiguous float32 array and scaled in place.
+        
+        The last feature of X is a lagged price, which the multi-step forecast
+        replaces with each predicted price. It can only hold one crop's price,
+        so lag_crop names that crop; forecasts for the other crops feed back
+        lag_crop's predictions and read their own output.
+        
+        Args:
+            X: Training features (time series features)
+            Y: Target values (future prices), one column per crop
+            crops: Crop names in the column order of Y
+            lag_crop: Crop whose price is the last feature of X (required
+                when training more than one crop)
+        """
+        if lag_crop is None and len(crops) == 1:
+            lag_crop = crops[0]
+        if lag_crop not in crops:
+            raise ValueError("lag_crop must name the trained crop whose price is the last feature")
+        
+        Y = np.asarray(Y)
+        model = RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            max_features='sqrt',
+            random_state=42,
+            n_jobs=-1
+        )
+        scaler = StandardScaler(copy=False, with_mean=True, with_std=True)
+        
         # Scale the features
-        X_scaled = self.price_scalers[crop].fit_transform(X)
+        X_scaled = scaler.fit_transform(self._as_f32(X))
+        
+        # Train the model (a single target is passed as 1-D, as scikit-learn expects)
+        model.fit(X_scaled, Y.ravel() if Y.shape[1] == 1 else Y)
+        predictions = model.predict(X_scaled).reshape(len(Y), -1)
+        
+        # FIL only handles single-output forests
+        fil_model = (self._compile_model(model, is_classifier=False, batch_size=1)
+                     if len(crops) == 1 else None)
+        flat_model = _flatten_forest(model)
+        price_mean = scaler.mean_.astype(np.float32)
+        price_inv_scale = (1.0 / scaler.scale_).astype(np.float32)
+        feature_importance = model.feature_importances_.copy()
+        lag_col = crops.index(lag_crop)
+        
+        for col, crop in enumerate(crops):
+            self.price_models[crop] = model
+            self.price_scalers[crop] = scaler
+            self._crop_col[crop] = col
+            self._lag_col[crop] = lag_col
+            self.trained_crops.add(crop)
+            self._price_r2[crop] = r2_score(Y[:, col], predictions[:, col])
+            self._price_mean[crop] = price_mean
+            self._price_inv_scale[crop] = price_inv_scale
+            self._price_feature_importance[crop] = feature_importance
+            self._fil_price[crop] = fil_model
+            self._flat_price[crop] = flat_model
+
+    def _compile_model(self, model, is_classifier: bool, batch_size: int):
+        """
+        Compile a trained forest with RAPIDS Forest Inference.
         
-        # Train the model
-        self.price_models[crop].fit(X_scaled, y)
-        self.trained_crops.add(crop)
+        Args:
+            model: Fitted scikit-learn forest
+            is_classifier: Whether the forest is a classifier
+            batch_size: Typical number of rows per prediction, used to tune the layout
+            
+        Returns:
+            ForestInference model, or None to predict with scikit-learn instead
+        """
+        if ForestInference is None:
+            return None
+        
+        try:
+            fil_model = ForestInference.load_from_sklearn(model, is_classifier=is_classifier,
+                                                          output_type='numpy')
+            fil_model.optimize(batch_size=batch_size)
+            return fil_model
+        except Exception as e:
+            print(f"Forest Inference unavailable, using scikit-learn: {str(e)}")
+            return None
+
+    def _predict_crop_proba(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Get crop class probabilities from the compiled forest if available."""
+        if self._fil_crop is not None:
+            return np.asarray(self._fil_crop.predict_proba(X_scaled))
+        return self.crop_model.predict_proba(X_scaled)
+
+    def _predict_price(self, X_scaled: np.ndarray, crop: str) -> np.ndarray:
+        """Get price predictions for a crop from the compiled forest if available."""
+        fil_model = self._fil_price.get(crop)
+        if fil_model is not None:
+            return np.asarray(fil_model.predict(X_scaled)).ravel()
+        predictions = self.price_models[crop].predict(X_scaled)
+        if predictions.ndim == 2:
+            predictions = predictions[:, self._crop_col[crop]]
+        return predictions
 
     def predict_best_crops(self, features: np.ndarray, n_recommendations: int = 3) -> List[str]:
         """
         Predict the best crops for given conditions.
         
         Args:
-            features: Input features for prediction
+            features: Input features for prediction (a single row)
             n_recommendations: Number of crop recommendations to return
             
         Returns:
             List of recommended crop names
         """
+        return self.predict_best_crops_batch(np.atleast_2d(features)[:1], n_recommendations)[0]
+
+    def predict_best_crops_batch(self, features: np.ndarray,
+                                 n_recommendations: int = 3) -> List[List[str]]:
+        """
+        Predict the best crops for several sets of conditions in one model call.
+        
+        Args:
+            features: Input features for prediction, one row per location
+            n_recommendations: Number of crop recommendations to return per row
+            
+        Returns:
+            List of recommended crop names for each row
+        """
         if not self.is_crop_model_trained:
             raise ValueError("Crop model must be trained before making predictions")
         
         # Preprocess features
-        X_scaled = self.preprocess_crop_data(features)
+        X_scaled = self.preprocess_crop_data(np.atleast_2d(features))
         
         # Get probability scores for each crop
-        crop_probabilities = self.crop_model.predict_proba(X_scaled)
-        
-        # Get top N crop recommendations
-        top_indices = np.argsort(crop_probabilities[0])[-n_recommendations:][::-1]
-        recommended_crops = [self.crop_model.classes_[i] for i in top_indices]
-        
-        return recommended_crops
+        crop_probabilities = self._predict_crop_proba(X_scaled)
+        
+        # Partition out the top N crops per row, then sort only those N
+        n = min(n_recommendations, crop_probabilities.shape[1])
+        top_indices = np.argpartition(crop_probabilities, -n, axis=1)[:, -n:]
+        order = np.argsort(np.take_along_axis(crop_probabilities, top_indices, axis=1), axis=1)[:, ::-1]
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        return self.crop_model.classes_[top_indices].tolist()
 
     def predict_future_price(self, features: np.ndarray, crop: str, 
                            forecast_periods: int = 12) -> Tuple[np.ndarray, float]:
@@ -157,22 +428,27 @@ class CropPredictionModel:
         # Preprocess features
         X_scaled = self.preprocess_price_data(features, crop)
         
-        # Make predictions for future periods
-        future_prices = []
-        current_features = X_scaled.copy()
-        
-        for _ in range(forecast_periods):
-            price = self.price_models[crop].predict(current_features.reshape(1, -1))[0]
-            future_prices.append(price)
+        # Make predictions for future periods, starting from the latest observation
+        scaler = self.price_scalers[crop]
+        if self._fil_price.get(crop) is None:
+            future_prices = _autoregress(self._flat_price[crop], X_scaled[-1],
+                                         forecast_periods, scaler.mean_[-1], scaler.scale_[-1],
+                                         output=self._crop_col[crop], lag_output=self._lag_col[crop])
+        else:
+            future_prices = np.empty(forecast_periods, dtype=np.float64)
+            current_features = X_scaled[-1:].copy()
             
-            # Update features for next prediction (assuming last feature is the price)
-            current_features[-1] = price
+            for period in range(forecast_periods):
+                price = self._predict_price(current_features, crop)[0]
+                future_prices[period] = price
+                
+                # Update features for next prediction (assuming last feature is the price)
+                current_features[0, -1] = (price - scaler.mean_[-1]) / scaler.scale_[-1]
         
-        # Calculate prediction confidence (using R² of the model)
-        confidence = self.price_models[crop].score(X_scaled, 
-                                                 self.price_scalers[crop].inverse_transform(features)[:, -1])
+        # Prediction confidence is the model's R² on its training data
+        confidence = self._price_r2[crop]
         
-        return np.array(future_prices), confidence
+        return future_prices, confidence
 
     def analyze_profit_potential(self, current_features: np.ndarray, 
                                crop: str, time_horizon: int = 6) -> Dict[str, Any]:
@@ -195,7 +471,7 @@ class CropPredictionModel:
         
         # Calculate statistics
         mean_price = np.mean(future_prices)
-        price_trend = np.polyfit(range(len(future_prices)), future_prices, 1)[0]
+        price_trend = linear_slope(future_prices)
         price_volatility = np.std(future_prices)
         
         return {
@@ -208,7 +484,7 @@ class CropPredictionModel:
             'best_selling_month': int(np.argmax(future_prices))
         }
 
-    def get_feature_importance(self, model_type: str = 'crop', crop: str = None) -> Dict[str, float]:
+    def get_feature_importance(self, model_type: str = 'crop', crop: str = None) -> np.ndarray:
         """
         Get feature importance scores.
         
@@ -217,7 +493,7 @@ class CropPredictionModel:
             crop: Required if model_type is 'price'
             
         Returns:
-            Dictionary mapping feature names to their importance scores
+            Array of importance scores in feature column order
         """
         if model_type == 'crop' and not self.is_crop_model_trained:
             raise ValueError("Crop model must be trained first")
@@ -225,11 +501,43 @@ class CropPredictionModel:
         if model_type == 'price':
             if crop not in self.trained_crops:
                 raise ValueError(f"No price model trained for crop: {crop}")
-            feature_importance = self.price_models[crop].feature_importances_
-        else:
-            feature_importance = self.crop_model.feature_importances_
+            return self._price_feature_importance[crop]
+        
+        return self._crop_feature_importance
+
+    @staticmethod
+    def _cache_get(cache: Dict, key: Any, ttl: float) -> Any:
+        """
+        Look up a cache entry that is younger than ttl seconds.
+        
+        Args:
+            cache: Cache dictionary
+            key: Cache key
+            ttl: Maximum age in seconds
+            
+        Returns:
+            Cached value or None if missing or expired
+        """
+        entry = cache.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    @staticmethod
+    def _cache_put(cache: Dict, key: Any, value: Any) -> None:
+        """
+        Store a cache entry, evicting the oldest entry once the cache is full.
         
-        return feature_importance
+        Args:
+            cache: Cache dictionary
+            key: Cache key
+            value: Value to store
+        """
+        cache.pop(key, None)
+        cache[key] = (time.monotonic(), value)
+        if len(cache) > MODEL_CACHE_MAX_ENTRIES:
+            # Another request thread may have evicted the same entry already
+            cache.pop(next(iter(cache)), None)
 
     def get_weather_data(self, city: str) -> Dict[str, Any]:
         """
@@ -242,10 +550,9 @@ class CropPredictionModel:
             Processed weather data
         """
         # Check cache first
-        if city in self.weather_cache:
-            cache_time, cache_data = self.weather_cache[city]
-            if datetime.now() - cache_time < timedelta(hours=1):
-                return cache_data
+        cached = self._weather_features(city)
+        if cached is not None:
+            return dict(zip(WEATHER_FEATURES, cached.tolist()))
         
         # Fetch fresh data
         weather_data = self.weather_api.get_current_weather(city)
@@ -255,13 +562,32 @@ class CropPredictionModel:
             processed_data = self.data_processor.process_weather_data(weather_data)
             
             # Update cache
-            self.weather_cache[city] = (datetime.now(), processed_data)
+            row = np.array([processed_data[f] for f in WEATHER_FEATURES], dtype=np.float64)
+            self._cache_put(self.weather_cache, city, row)
             return processed_data
         
         return {}
 
+    def _weather_features(self, city: str) -> Optional[np.ndarray]:
+        """
+        Get the cached weather feature row for a city.
+        
+        Args:
+            city: City name
+            
+        Returns:
+            Array of WEATHER_FEATURES values, or None if missing or expired
+        """
+        return self._cache_get(self.weather_cache, city, PROCESSED_WEATHER_CACHE_TTL)
+
+    def _market_window(self) -> Tuple[datetime, datetime]:
+        """Get the date range of market history used for analysis (last 1 year)."""
+        end_date = datetime.now()
+        return end_date - timedelta(days=365), end_date
+
     def get_market_analysis(self, state: str, district: str, 
-                          commodity: str) -> Dict[str, Any]:
+                          commodity: str,
+                          market_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Get comprehensive market analysis for a crop.
         
@@ -269,47 +595,116 @@ class CropPredictionModel:
             state: State name
             district: District name
             commodity: Commodity name
+            market_data: Market data already fetched for the commodity (optional)
             
         Returns:
             Market analysis data
         """
+        # Analyses are cached, so repeat calls skip both the fetch and the parsing
+        cache_key = (state, district, commodity.lower())
+        cached = self._cache_get(self.market_cache, cache_key, MARKET_ANALYSIS_CACHE_TTL)
+        if cached is not None:
+            return cached
+        
         # Get historical market data
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=365)  # Last 1 year
-        
-        market_data = self.market_api.get_market_data(
-            state=state,
-            district=district,
-            commodity=commodity,
-            start_date=start_date,
-            end_date=end_date
-        )
+        if market_data is None:
+            start_date, end_date = self._market_window()
+            market_data = self.market_api.get_market_data(
+                state=state,
+                district=district,
+                commodity=commodity,
+                start_date=start_date,
+                end_date=end_date
+            )
         
         if not market_data['records']:
             return {}
         
-        # Process market data
-        df = pd.DataFrame(market_data['records'])
-        df['Arrival_Date'] = pd.to_datetime(df['Arrival_Date'], format='%d/%m/%Y')
-        df['Modal_Price'] = df['Modal_Price'].astype(float)
+        # Process market data straight into arrays; a DataFrame costs more than
+        # the arithmetic for a year of records
+        records = market_data['records']
+        prices = np.fromiter((r['price_per_ton'] for r in records),
+                             dtype=np.float64, count=len(records))
+        months = np.fromiter((r['date'].month for r in records),
+                             dtype=np.intp, count=len(records))
         
         # Calculate market trends
         analysis = {
-            'current_price': float(df.iloc[-1]['Modal_Price']),
-            'avg_price': float(df['Modal_Price'].mean()),
-            'min_price': float(df['Modal_Price'].min()),
-            'max_price': float(df['Modal_Price'].max()),
-            'price_volatility': float(df['Modal_Price'].std()),
-            'price_trend': float(np.polyfit(range(len(df)), df['Modal_Price'], 1)[0])
+            'current_price': float(prices[-1]),
+            'avg_price': float(prices.mean()),
+            'min_price': float(prices.min()),
+            'max_price': float(prices.max()),
+            'price_volatility': float(np.std(prices, ddof=1)) if len(prices) > 1 else float('nan'),
+            'price_trend': linear_slope(prices)
         }
         
-        # Add seasonal patterns
-        df['month'] = df['Arrival_Date'].dt.month
-        monthly_avg = df.groupby('month')['Modal_Price'].mean().to_dict()
-        analysis['seasonal_patterns'] = monthly_avg
+        # Add seasonal patterns (average price per month)
+        month_totals = np.bincount(months, weights=prices, minlength=13)
+        month_counts = np.bincount(months, minlength=13)
+        analysis['seasonal_patterns'] = {
+            int(month): float(month_totals[month] / month_counts[month])
+            for month in np.flatnonzero(month_counts)
+        }
         
+        self._cache_put(self.market_cache, cache_key, analysis)
         return analysis
 
+    def _analyze_one_crop(self, crop: str, market_analysis: Dict[str, Any], features: np.ndarray,
+                          suitability_score: Optional[np.ndarray], weather_data: Dict[str, Any],
+                          farm_size: float, soil_quality: float) -> Dict[str, Any]:
+        """
+        Forecast prices and profitability for one crop of a comprehensive prediction.
+        
+        Args:
+            crop: Crop name
+            market_analysis: Market analysis for the crop
+            features: Combined feature row for the crop
+            suitability_score: Crop model class probabilities, or None if untrained
+            weather_data: Processed weather data
+            farm_size: Size of the farm in hectares
+            soil_quality: Texture score of the farm's soil
+            
+        Returns:
+            Analysis for the crop
+        """
+        # Get price predictions
+        if crop in self.trained_crops:
+            future_prices, confidence = self.predict_future_price(
+                features, crop, forecast_periods=12
+            )
+        else:
+            future_prices, confidence = None, None
+        
+        # Calculate profit potential
+        profit_analysis = self.profit_calculator.analyze_profitability(
+            crop,
+            area=farm_size,  # Use actual farm size
+            market_data={
+                'price_per_ton': market_analysis['current_price'],
+                'risk_factor': 0.1
+            },
+            conditions={
+                'weather_quality': weather_data.get('weather_score', 0.8),
+                'soil_quality': soil_quality,
+                'management_efficiency': 0.9,
+                'base_yield': 1.0  # Base yield per hectare
+            },
+            input_costs=self._DEFAULT_INPUT_COSTS
+        )
+        
+        crop_analysis = {
+            'crop': crop,
+            'suitability_score': float(max(suitability_score)) if suitability_score is not None else None,
+            'market_analysis': market_analysis,
+            'future_price_prediction': {
+                'prices': future_prices,
+                'confidence': confidence
+            },
+            'profit_analysis': profit_analysis
+        }
+        
+        return crop_analysis
+
     def get_comprehensive_prediction(self, 
                                   city: str, 
                                   state: str, 
@@ -331,82 +726,59 @@ class CropPredictionModel:
         Returns:
             Comprehensive analysis and predictions
         """
-        # Get weather data
-        weather_data = self.get_weather_data(city)
+        # Get weather data and market history for crops without a cached
+        # analysis at the same time
+        start_date, end_date = self._market_window()
+        uncached = [crop for crop in crops
+                    if self._cache_get(self.market_cache, (state, district, crop.lower()),
+                                       MARKET_ANALYSIS_CACHE_TTL) is None]
+        calls = {'weather': partial(self.get_weather_data, city)}
+        if uncached:
+            calls['market'] = partial(self.market_api.get_market_data_bulk, state, district, uncached,
+                                      start_date=start_date, end_date=end_date)
+        fetched = fetch_concurrently(calls)
+        weather_data = fetched['weather']
+        market_data = fetched.get('market', {})
         
         results = {
             'weather_conditions': weather_data,
             'crop_analysis': []
         }
         
+        # Weather features are the same for every crop, so they are built once,
+        # straight from the cached row for the city when there is one
+        weather_features = self._weather_features(city)
+        if weather_features is None:
+            weather_features = self.data_processor.weather_to_features(weather_data)
+        
+        # Get market analysis and prepare features for each crop
+        crop_inputs = {}
         for crop in crops:
-            # Get market analysis
-            market_analysis = self.get_market_analysis(state, district, crop)
-            
-            if not market_analysis:
-                continue
-            
-            # Prepare features for prediction
-            features = self.data_processor.combine_features(weather_data, market_analysis)
-            
-            # Get crop suitability score
-            if self.is_crop_model_trained:
-                suitability_score = self.crop_model.predict_proba(
-                    self.preprocess_crop_data(features.reshape(1, -1))
-                )[0]
-            else:
-                suitability_score = None
-            
-            # Get price predictions
-            if crop in self.trained_crops:
-                future_prices, confidence = self.predict_future_price(
-                    features, crop, forecast_periods=12
-                )
-            else:
-                future_prices, confidence = None, None
-            
-            # Get soil quality score for the specific soil type
-            soil_data = {
-                'soil_type': soil_type
-            }
-            processed_soil = self.data_processor.process_soil_data(soil_data, farm_size)
-            soil_quality = processed_soil.get('texture_score', 0.8)
-            
-            # Calculate profit potential
-            profit_analysis = self.profit_calculator.analyze_profitability(
-                crop,
-                area=farm_size,  # Use actual farm size
-                market_data={
-                    'price_per_ton': market_analysis['current_price'],
-                    'risk_factor': 0.1
-                },
-                conditions={
-                    'weather_quality': weather_data.get('weather_score', 0.8),
-                    'soil_quality': soil_quality,
-                    'management_efficiency': 0.9,
-                    'base_yield': 1.0  # Base yield per hectare
-                },
-                input_costs={
-                    'seeds': 100,
-                    'fertilizer': 200,
-                    'irrigation': 150,
-                    'labor': 300,
-                    'equipment': 250
-                }
-            )
-            
-            crop_analysis = {
-                'crop': crop,
-                'suitability_score': float(max(suitability_score)) if suitability_score is not None else None,
-                'market_analysis': market_analysis,
-                'future_price_prediction': {
-                    'prices': future_prices.tolist() if future_prices is not None else None,
-                    'confidence': confidence
-                },
-                'profit_analysis': profit_analysis
-            }
-            
-            results['crop_analysis'].append(crop_analysis)
+            market_analysis = self.get_market_analysis(state, district, crop,
+                                                       market_data=market_data.get(crop))
+            if market_analysis:
+                features = self.data_processor.combine_features(weather_features, market_analysis)
+                crop_inputs[crop] = (market_analysis, features.reshape(1, -1))
+        
+        # Score the suitability of every crop in a single model call
+        suitability_scores = {}
+        if self.is_crop_model_trained and crop_inputs:
+            X = np.vstack([features for _, features in crop_inputs.values()])
+            probabilities = self._predict_crop_proba(self.preprocess_crop_data(X))
+            suitability_scores = dict(zip(crop_inputs, probabilities))
+        
+        # Get soil quality score for the specific soil type (the same for every crop)
+        processed_soil = self.data_processor.process_soil_data({'soil_type': soil_type}, farm_size)
+        soil_quality = processed_soil.get('texture_score', 0.8)
+        
+        # Forecast and cost out each crop. This runs sequentially: on these
+        # single-row arrays the work is Python-bound and holds the GIL, so a
+        # thread pool measured no faster.
+        results['crop_analysis'] = [
+            self._analyze_one_crop(crop, market_analysis, features, suitability_scores.get(crop),
+                                   weather_data, farm_size, soil_quality)
+            for crop, (market_analysis, features) in crop_inputs.items()
+        ]
         
         # Sort crops by profitability
         results['crop_analysis'].sort(key=lambda x: x['profit_analysis']['projected_profit'], reverse=True)
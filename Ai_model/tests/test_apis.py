@@ -2,12 +2,30 @@
 Unit tests for API integrations.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
+import pyarrow.dataset as ds
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from api.weather_api import WeatherAPI
-from api.market_api import MarketAPI
-from api.team_apis import TeamAPI
+from api import market_api
+from api.market_api import MarketAPI, ensure_parquet
+from api.team_apis import TeamAPI, TeamAPIs
+from utils.concurrency import fetch_concurrently
+from api.session import create_session
+
+class TestSession(unittest.TestCase):
+    def test_sessions_do_not_share_adapters(self):
+        """Test that closing one client's session leaves other sessions usable."""
+        first, second = create_session(), create_session()
+        self.assertIsNot(first.get_adapter('https://example.com'),
+                         second.get_adapter('https://example.com'))
+
+        retry = first.get_adapter('https://example.com').max_retries
+        self.assertEqual(retry.connect, 0)
+        self.assertNotIn('POST', retry.allowed_methods)
 
 class TestWeatherAPI(unittest.TestCase):
     def setUp(self):
@@ -67,6 +85,43 @@ class TestWeatherAPI(unittest.TestCase):
         self.assertIsNone(result)
         mock_get.assert_called_once()
 
+    def test_current_weather_is_cached(self):
+        """Test that repeated lookups for a city reuse the cached response."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.content = b'{"main": {"temp": 31.0, "humidity": 70}}'
+
+        with patch.object(self.weather_api._session, 'get', return_value=mock_response) as mock_get:
+            first = self.weather_api.get_current_weather('Chennai')
+            second = self.weather_api.get_current_weather('Chennai')
+
+        self.assertEqual(first['temperature'], 31.0)
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+
+    @patch('api.weather_api.MODEL_CACHE_MAX_ENTRIES', 2)
+    def test_current_weather_cache_is_bounded(self):
+        """Test that the weather cache evicts the oldest city once full."""
+        mock_response = MagicMock(status_code=200)
+        mock_response.content = b'{"main": {"temp": 31.0, "humidity": 70}}'
+
+        with patch.object(self.weather_api._session, 'get', return_value=mock_response):
+            for city in ('Chennai', 'Madurai', 'Salem'):
+                self.weather_api.get_current_weather(city)
+
+        self.assertEqual(list(self.weather_api._cache), [('Madurai', 'EN'), ('Salem', 'EN')])
+
+    def test_rapidapi_headers_only_sent_to_openweather(self):
+        """Test that the RapidAPI credentials are not sent to the forecast provider."""
+        self.assertNotIn('x-rapidapi-key', self.weather_api._session.headers)
+
+        mock_response = MagicMock(status_code=200)
+        mock_response.content = b'{"main": {"temp": 31.0}}'
+        with patch.object(self.weather_api._session, 'get', return_value=mock_response) as mock_get:
+            self.weather_api.get_current_weather('Madurai')
+
+        self.assertEqual(mock_get.call_args.kwargs['headers']['x-rapidapi-key'],
+                         self.weather_api.headers['x-rapidapi-key'])
+
 class TestMarketAPI(unittest.TestCase):
     def setUp(self):
         """Set up test environment before each test."""
@@ -117,6 +172,111 @@ class TestMarketAPI(unittest.TestCase):
         self.assertEqual(len(result['prices']), 2)
         mock_get.assert_called_once()
 
+    def test_get_market_data(self):
+        """Test filtering market history by crop and date range."""
+        result = self.market_api.get_market_data(
+            'Tamil Nadu', 'Chennai', 'Wheat',
+            start_date=datetime(2024, 1, 2),
+            end_date=datetime(2024, 1, 4)
+        )
+
+        self.assertEqual(result['total'], 3)
+        self.assertTrue(all(r['crop'] == 'wheat' for r in result['records']))
+        self.assertEqual(result['records'][0]['price_per_ton'], 385.0)
+
+    @patch('api.market_api.MARKET_HISTORY_CACHE_MAX_BYTES', 0)
+    def test_get_market_data_from_parquet(self):
+        """Test that the Parquet scan matches the in-memory lookup."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'crop_market_history.csv')
+            shutil.copyfile(market_api.MARKET_CSV_PATH, csv_path)
+            with patch('api.market_api.MARKET_CSV_PATH', csv_path), \
+                 patch('api.market_api.MARKET_PARQUET_PATH',
+                       os.path.join(tmp, 'crop_market_history.parquet')):
+                scanned = MarketAPI().get_market_data('Tamil Nadu', 'Chennai', 'rice')
+        with patch('api.market_api.MARKET_HISTORY_CACHE_MAX_BYTES', 1 << 30):
+            cached = MarketAPI().get_market_data('Tamil Nadu', 'Chennai', 'rice')
+
+        self.assertEqual(scanned['total'], cached['total'])
+        self.assertEqual(
+            [r['price_per_ton'] for r in scanned['records']],
+            [r['price_per_ton'] for r in cached['records']]
+        )
+
+    def test_get_market_data_bulk(self):
+        """Test looking up several commodities at once."""
+        result = self.market_api.get_market_data_bulk(
+            'Tamil Nadu', 'Chennai', ['Rice', 'corn', 'saffron'],
+            start_date=datetime(2024, 1, 3),
+            end_date=datetime(2024, 1, 4)
+        )
+
+        self.assertEqual(set(result), {'Rice', 'corn', 'saffron'})
+        self.assertEqual(result['Rice'], self.market_api.get_market_data(
+            'Tamil Nadu', 'Chennai', 'rice',
+            start_date=datetime(2024, 1, 3),
+            end_date=datetime(2024, 1, 4)
+        ))
+        self.assertEqual(result['corn']['total'], 2)
+        self.assertEqual(result['saffron'], {"total": 0, "records": []})
+
+    def test_get_market_data_bulk_case_variants(self):
+        """Test that commodity names differing only by case each get their records."""
+        result = self.market_api.get_market_data_bulk('Tamil Nadu', 'Chennai', ['Rice', 'rice'])
+
+        self.assertGreater(result['Rice']['total'], 0)
+        self.assertEqual(result['Rice'], result['rice'])
+
+    @patch('api.market_api.MARKET_HISTORY_BLOCK_BYTES', 64)
+    def test_ensure_parquet_streams_csv(self):
+        """Test converting a CSV to Parquet in small blocks."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'history.csv')
+            parquet_path = os.path.join(tmp, 'history.parquet')
+            with open(csv_path, 'w') as f:
+                f.write('date,crop,price_per_ton,volume_traded,market_location\n')
+                for day in range(1, 10):
+                    f.write(f'2024-01-0{day},{"Rice" if day % 2 else "wheat"},{400 + day},100,Asia Market\n')
+
+            ensure_parquet(csv_path, parquet_path)
+            table = ds.dataset(parquet_path, format='parquet', partitioning='hive').to_table(
+                filter=ds.field('crop') == 'rice'
+            )
+
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(sorted(table.column('price_per_ton').to_pylist()), [401, 403, 405, 407, 409])
+
+    def test_ensure_parquet_failure_leaves_no_dataset(self):
+        """Test that a failed conversion leaves neither a partial dataset nor temp files."""
+        def write_partial(data, base_dir, **kwargs):
+            with open(os.path.join(base_dir, 'part-0.parquet'), 'w') as f:
+                f.write('partial')
+            raise OSError('disk full')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'history.csv')
+            parquet_path = os.path.join(tmp, 'history.parquet')
+            with open(csv_path, 'w') as f:
+                f.write('date,crop,price_per_ton,volume_traded,market_location\n')
+                f.write('2024-01-01,rice,400,100,Asia Market\n')
+
+            with patch('api.market_api.ds.write_dataset', side_effect=write_partial):
+                with self.assertRaises(OSError):
+                    ensure_parquet(csv_path, parquet_path)
+
+            self.assertEqual(os.listdir(tmp), ['history.csv'])
+
+            ensure_parquet(csv_path, parquet_path)
+            table = ds.dataset(parquet_path, format='parquet', partitioning='hive').to_table()
+
+        self.assertEqual(table.num_rows, 1)
+
+    def test_get_market_data_unknown_crop(self):
+        """Test market history lookup for a crop with no records."""
+        result = self.market_api.get_market_data('Tamil Nadu', 'Chennai', 'saffron')
+
+        self.assertEqual(result, {"total": 0, "records": []})
+
 class TestTeamAPI(unittest.TestCase):
     def setUp(self):
         """Set up test environment before each test."""
@@ -173,5 +333,47 @@ class TestTeamAPI(unittest.TestCase):
         self.assertIsNone(result)
         mock_request.assert_called_once()
 
+class TestTeamAPIs(unittest.TestCase):
+    def test_fetch_concurrently(self):
+        """Test that concurrent calls are returned under their names."""
+        result = fetch_concurrently({
+            'a': lambda: 1,
+            'b': lambda: 'two'
+        })
+
+        self.assertEqual(result, {'a': 1, 'b': 'two'})
+
+    @patch.object(TeamAPIs, '_get_json')
+    def test_get_all_data(self, mock_get_json):
+        """Test combining the team API responses."""
+        mock_get_json.side_effect = lambda url: {
+            'location': 'Chennai, Tamil Nadu',
+            'farm_size': 4.5,
+            'soil_texture': 'clay'
+        }
+
+        result = TeamAPIs().get_all_data()
+
+        self.assertEqual(result['location'], 'Chennai, Tamil Nadu')
+        self.assertEqual(result['farm_size'], 4.5)
+        self.assertEqual(result['soil_texture'], 'clay')
+        self.assertEqual(mock_get_json.call_count, 3)
+
+    def test_get_soil_data_uses_prepared_request(self):
+        """Test that soil lookups only swap the location into the prepared request."""
+        team_api = TeamAPI()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'ph': 6.5}
+
+        with patch.object(team_api._session, 'send', return_value=mock_response) as mock_send:
+            first = team_api.get_soil_data('field 1')
+            team_api.get_soil_data('field2')
+
+        self.assertEqual(first, {'ph': 6.5})
+        sent = [call.args[0].url for call in mock_send.call_args_list]
+        self.assertTrue(sent[0].endswith('/soil/field%201'))
+        self.assertTrue(sent[1].endswith('/soil/field2'))
+        self.assertTrue(team_api._soil_request.url.endswith('/soil/'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
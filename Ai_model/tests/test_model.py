@@ -2,10 +2,19 @@
 Unit tests for crop prediction model.
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 import numpy as np
-from models.crop_prediction_model import CropPredictionModel
+import pandas as pd
+from unittest.mock import patch
+from datetime import datetime
+from models.crop_prediction_model import CropPredictionModel, prediction_to_json
 from models.crop_database import CropDatabase
+from api.weather_api import WeatherAPI
+from utils.data_processor import DataProcessor
+from utils.profit_calculator import ProfitCalculator
 
 class TestCropPredictionModel(unittest.TestCase):
     def setUp(self):
@@ -16,6 +25,7 @@ class TestCropPredictionModel(unittest.TestCase):
             [28.0, 70.0, 150.0, 7.0, 45.0, 35.0, 35.0, 3.0]
         ])
         self.sample_labels = np.array(['rice', 'wheat'])
+        self.price_features = np.random.default_rng(0).uniform(100, 500, size=(200, 4))
 
     def test_model_initialization(self):
         """Test model initialization."""
@@ -58,6 +68,160 @@ class TestCropPredictionModel(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.model.predict(test_features)
 
+    def test_predict_best_crops(self):
+        """Test crop recommendations from the trained crop model."""
+        self.model.train_crop_model(self.sample_features, self.sample_labels)
+        
+        test_features = np.array([[26.0, 65.0, 120.0, 6.8, 48.0, 32.0, 38.0, 2.8]])
+        recommended = self.model.predict_best_crops(test_features, n_recommendations=2)
+        
+        self.assertEqual(sorted(recommended), ['rice', 'wheat'])
+
+    def test_predict_best_crops_batch(self):
+        """Test that batched recommendations match single-row recommendations."""
+        self.model.train_crop_model(self.sample_features, self.sample_labels)
+        
+        batch = self.model.predict_best_crops_batch(self.sample_features, n_recommendations=1)
+        
+        self.assertEqual(len(batch), 2)
+        for row, recommended in zip(self.sample_features, batch):
+            self.assertEqual(recommended, self.model.predict_best_crops(row, n_recommendations=1))
+
+    def test_predict_future_price(self):
+        """Test the autoregressive price forecast."""
+        X = self.price_features[:40]
+        self.model.train_price_model(X, X[:, -1] * 1.05, 'rice')
+        
+        prices, _ = self.model.predict_future_price(X[-3:], 'rice', forecast_periods=6)
+        
+        self.assertEqual(prices.shape, (6,))
+        self.assertTrue(np.all(np.isfinite(prices)))
+
+    def test_predict_future_price_with_missing_feature(self):
+        """Test that a NaN feature is routed through the trees as scikit-learn does."""
+        X = self.price_features[:40]
+        self.model.train_price_model(X, X[:, -1] * 1.05, 'rice')
+        row = X[-1:].copy()
+        row[0, 1] = np.nan
+        
+        prices, _ = self.model.predict_future_price(row, 'rice', forecast_periods=1)
+        expected = self.model.price_models['rice'].predict(self.model.preprocess_price_data(row, 'rice'))
+        
+        self.assertAlmostEqual(prices[0], expected[0])
+
+    def test_train_price_model_multi(self):
+        """Test that crops trained together share one forest but keep their own outputs."""
+        X = self.price_features[:60]
+        Y = np.column_stack([X[:, -1] * 1.05, X[:, -1] * 0.5])
+        self.model.train_price_model_multi(X, Y, ['rice', 'corn'], lag_crop='rice')
+        
+        rice, _ = self.model.predict_future_price(X[-1:], 'rice', forecast_periods=1)
+        corn, _ = self.model.predict_future_price(X[-1:], 'corn', forecast_periods=1)
+        
+        self.assertIs(self.model.price_models['rice'], self.model.price_models['corn'])
+        self.assertGreater(rice[0], corn[0])
+
+    def test_multi_output_forecast_feeds_back_lag_crop(self):
+        """Test that every crop of a shared model rolls forward on the lag crop's price."""
+        X = self.price_features
+        Y = np.column_stack([X[:, -1], X[:, -1] * 0.5])
+        self.model.train_price_model_multi(X, Y, ['rice', 'corn'], lag_crop='rice')
+        
+        rice, _ = self.model.predict_future_price(X[-1:], 'rice', forecast_periods=6)
+        corn, _ = self.model.predict_future_price(X[-1:], 'corn', forecast_periods=6)
+        
+        # Corn tracks half of rice's price at every step instead of diverging
+        np.testing.assert_allclose(corn, rice * 0.5, rtol=0.15)
+        
+        with self.assertRaises(ValueError):
+            self.model.train_price_model_multi(X, Y, ['rice', 'corn'])
+
+    def test_prediction_to_json(self):
+        """Test serializing forecast arrays and month-keyed patterns."""
+        prediction = {
+            'crop_analysis': [{
+                'market_analysis': {'seasonal_patterns': {1: 300.0}},
+                'future_price_prediction': {'prices': np.array([310.0, 320.5]), 'confidence': 0.9}
+            }]
+        }
+        
+        self.assertEqual(
+            prediction_to_json(prediction),
+            b'{"crop_analysis":[{"market_analysis":{"seasonal_patterns":{"1":300.0}},'
+            b'"future_price_prediction":{"prices":[310.0,320.5],"confidence":0.9}}]}'
+        )
+
+    def test_comprehensive_endpoint_serializes_numpy(self):
+        """Test that the web app returns comprehensive predictions holding NumPy values."""
+        from web_app.app import create_app
+        prediction = {
+            'weather_conditions': {'temperature': np.float64(31.0)},
+            'crop_analysis': [{
+                'crop': 'rice',
+                'future_price_prediction': {'prices': np.array([310.0, 320.5]), 'confidence': 0.9}
+            }]
+        }
+        
+        with patch.object(CropPredictionModel, 'get_comprehensive_prediction', return_value=prediction):
+            response = create_app().test_client().post('/comprehensive', json={
+                'city': 'Chennai', 'state': 'Tamil Nadu', 'district': 'Chennai', 'crops': ['rice']
+            })
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['crop_analysis'][0]['future_price_prediction']['prices'],
+                         [310.0, 320.5])
+
+    def test_comprehensive_endpoint_over_market_history(self):
+        """Test a comprehensive prediction end to end over the sample market history."""
+        from web_app.app import create_app
+        weather = {'temperature': 30.0, 'humidity': 70, 'rainfall': 0.0, 'weather_score': None}
+        
+        # Only the weather service and the clock are replaced; the sample
+        # history covers January 2024
+        with patch.object(WeatherAPI, 'get_current_weather', return_value=weather), \
+             patch.object(CropPredictionModel, '_market_window',
+                          return_value=(datetime(2024, 1, 1), datetime(2024, 12, 31))):
+            response = create_app().test_client().post('/comprehensive', json={
+                'city': 'Chennai', 'state': 'Tamil Nadu', 'district': 'Chennai', 'crops': ['rice', 'Wheat']
+            })
+        
+        self.assertEqual(response.status_code, 200)
+        analyses = {a['crop']: a for a in response.get_json()['crop_analysis']}
+        self.assertEqual(set(analyses), {'rice', 'Wheat'})
+        self.assertEqual(analyses['rice']['market_analysis']['current_price'], 465.0)
+        self.assertEqual(analyses['Wheat']['market_analysis']['seasonal_patterns'], {'1': 386.2857142857143})
+
+    def test_market_analysis_is_cached(self):
+        """Test that repeat market analyses skip the market API."""
+        records = [
+            {'date': pd.Timestamp('2024-01-01'), 'crop': 'rice', 'price_per_ton': 300.0,
+             'volume_traded': 1000, 'market_location': 'Asia Market'},
+            {'date': pd.Timestamp('2024-02-01'), 'crop': 'rice', 'price_per_ton': 320.0,
+             'volume_traded': 1100, 'market_location': 'Asia Market'}
+        ]
+        with patch.object(self.model.market_api, 'get_market_data',
+                          return_value={'total': 2, 'records': records}) as mock_get:
+            first = self.model.get_market_analysis('Tamil Nadu', 'Chennai', 'Rice')
+            second = self.model.get_market_analysis('Tamil Nadu', 'Chennai', 'rice')
+        
+        self.assertEqual(first['current_price'], 320.0)
+        self.assertEqual(first['seasonal_patterns'], {1: 300.0, 2: 320.0})
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+
+    def test_weather_data_is_cached(self):
+        """Test that processed weather is cached as a feature row per city."""
+        weather = {'temperature': 30.0, 'humidity': 70, 'rainfall': 0.0, 'weather_score': None}
+        with patch.object(self.model.weather_api, 'get_current_weather',
+                          return_value=weather) as mock_get:
+            first = self.model.get_weather_data('Chennai')
+            second = self.model.get_weather_data('Chennai')
+        
+        self.assertEqual(first, second)
+        self.assertEqual(first['weather_score'], 0.8)
+        np.testing.assert_array_equal(self.model._weather_features('Chennai'), [0.8, 30.0, 70.0, 0.0])
+        mock_get.assert_called_once()
+
     def test_feature_importance_without_training(self):
         """Test feature importance without training."""
         with self.assertRaises(ValueError):
@@ -66,7 +230,12 @@ class TestCropPredictionModel(unittest.TestCase):
 class TestCropDatabase(unittest.TestCase):
     def setUp(self):
         """Set up test environment before each test."""
-        self.db = CropDatabase()
+        # Work on a copy so added crops and the journal stay out of data/
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        data_file = os.path.join(self.tmp.name, 'sample_data.json')
+        shutil.copyfile('data/sample_data.json', data_file)
+        self.db = CropDatabase(data_file)
         self.test_crop = {
             'name': 'test_crop',
             'growing_season': 'summer',
@@ -108,6 +277,58 @@ class TestCropDatabase(unittest.TestCase):
         crop_info = self.db.get_crop_info('test_crop')
         self.assertEqual(crop_info['water_needs'], 'high')
 
+    def test_update_does_not_leak_between_instances(self):
+        """Test that instances sharing a cached file keep separate data."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'crops.json')
+            with open(path, 'w') as f:
+                f.write('{"rice": {"water_needs": "high"}}')
+
+            first = CropDatabase(path)
+            second = CropDatabase(path)
+            first.update_crop('rice', {'water_needs': 'low'})
+            first.add_crop('wheat', {'water_needs': 'medium'})
+
+            self.assertEqual(second.get_crop_info('rice')['water_needs'], 'high')
+            self.assertIsNone(second.get_crop_info('wheat'))
+            self.assertEqual(CropDatabase(path).get_crop_info('rice')['water_needs'], 'low')
+
+    @patch('models.crop_database.CROP_JOURNAL_COMPACT_EVERY', 3)
+    def test_journal_is_replayed_and_compacted(self):
+        """Test that journaled changes survive a reload and are folded into the data file."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'crops.json')
+            with open(path, 'w') as f:
+                f.write('{"rice": {"water_needs": "high"}}')
+
+            db = CropDatabase(path)
+            db.add_crop('wheat', {'water_needs': 'medium'})
+            db.update_crop('rice', {'season': 'kharif'})
+            with open(path) as f:
+                self.assertNotIn('wheat', f.read())
+            self.assertEqual(CropDatabase(path).get_crop_info('rice'), {'water_needs': 'high', 'season': 'kharif'})
+
+            db.add_crop('corn', {'water_needs': 'low'})
+            self.assertEqual(os.path.getsize(db.journal_file), 0)
+            self.assertEqual(CropDatabase(path).get_all_crops(), ['rice', 'wheat', 'corn'])
+
+    def test_save_keeps_file_mode_and_cleans_up_on_failure(self):
+        """Test that compaction keeps the data file's permissions and leaves no temp files."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'crops.json')
+            with open(path, 'w') as f:
+                f.write('{}')
+            os.chmod(path, 0o644)
+
+            db = CropDatabase(path)
+            db.add_crop('wheat', {'water_needs': 'medium'})
+            db._save_data()
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+            with patch('models.crop_database.os.replace', side_effect=OSError('disk full')):
+                db._save_data()
+            self.assertEqual(sorted(os.listdir(tmp)), ['crops.json', 'crops_journal.jsonl'])
+
     def test_get_all_crops(self):
         """Test getting all crops."""
         # Add multiple crops
@@ -119,5 +340,74 @@ class TestCropDatabase(unittest.TestCase):
         self.assertIn('crop1', crops)
         self.assertIn('crop2', crops)
 
+class TestDataProcessor(unittest.TestCase):
+    def test_prepare_historical_data_matches_pandas_rolling(self):
+        """Test that the price features match pandas rolling windows back-filled with bfill()."""
+        rng = np.random.default_rng(0)
+        dates = pd.date_range('2024-01-01', periods=45)
+        history = pd.DataFrame({
+            'date': list(dates) * 2,
+            'crop': ['wheat'] * 45 + ['rice'] * 45,
+            'price': rng.uniform(200, 500, 90),
+            'demand_index': rng.uniform(0, 1, 90),
+            'supply_index': rng.uniform(0, 1, 90)
+        }).sample(frac=1, random_state=1)
+
+        X, y = DataProcessor().prepare_historical_data(history)
+
+        start = 0
+        for _, crop_data in history.sort_values(['crop', 'date']).groupby('crop', sort=False):
+            prices = crop_data['price'].reset_index(drop=True)
+            expected = np.column_stack([
+                prices,
+                prices.rolling(7).mean().bfill(),
+                prices.rolling(30).mean().bfill(),
+                prices.diff(7).fillna(0),
+                prices.rolling(14).std().bfill(),
+                np.full(len(prices), crop_data['demand_index'].mean()),
+                np.full(len(prices), crop_data['supply_index'].mean())
+            ])
+            end = start + len(prices)
+            np.testing.assert_allclose(X[start:end], expected)
+            np.testing.assert_allclose(y[start:end], prices)
+            start = end
+
+    def test_prepare_historical_data_with_missing_crop(self):
+        """Test that rows without a crop still get their price features."""
+        history = pd.DataFrame({
+            'date': pd.date_range('2024-01-01', periods=4),
+            'crop': ['rice', None, 'rice', None],
+            'price': [300.0, 200.0, 310.0, 210.0],
+            'demand_index': 0.5,
+            'supply_index': 0.5
+        })
+        
+        X, y = DataProcessor().prepare_historical_data(history)
+        named_X, named_y = DataProcessor().prepare_historical_data(history.fillna({'crop': 'wheat'}))
+        
+        # The rows without a crop are featurized like any other crop
+        np.testing.assert_array_equal(y, [300.0, 310.0, 200.0, 210.0])
+        np.testing.assert_array_equal(y, named_y)
+        np.testing.assert_array_equal(X, named_X)
+
+class TestProfitCalculator(unittest.TestCase):
+    def test_analyze_profitability_batch(self):
+        """Test that the batched analysis matches analyzing each crop alone."""
+        calculator = ProfitCalculator()
+        crops = ['wheat', 'rice', 'corn']
+        areas = [2.0, 1.5, 0.0]
+        market_data = [{'price_per_ton': 300.0}, {'price_per_ton': 420.0, 'risk_factor': 0.2}, {}]
+        conditions = [{'base_yield': 3.5, 'weather_quality': 0.9},
+                      {'base_yield': 4.0, 'soil_quality': 1.1}, {'base_yield': 5.0}]
+        input_costs = [{'seeds': 100.0, 'labor': 250.0}, {'fertilizer': 180.0}, {'seeds': 90.0}]
+
+        batch = calculator.analyze_profitability_batch(crops, areas, market_data, conditions, input_costs)
+
+        for i, crop in enumerate(crops):
+            single = calculator.analyze_profitability(crop, areas[i], market_data[i],
+                                                      conditions[i], input_costs[i])
+            for metric, value in single.items():
+                self.assertAlmostEqual(batch[metric][i], value)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Concurrency helpers shared by the API clients and the prediction model.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+def fetch_concurrently(calls: Dict[str, Callable[[], Any]], max_workers: int = 8) -> Dict[str, Any]:
+    """
+    Run independent API calls on a thread pool.
+    
+    The calls are network-bound, so issuing them together costs roughly the
+    slowest call instead of the sum of all of them.
+    
+    Args:
+        calls: Mapping of result name to a zero-argument callable
+        max_workers: Maximum number of calls in flight at once
+        
+    Returns:
+        Dictionary mapping each name to the result of its call
+    """
+    if not calls:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+        futures = {name: executor.submit(call) for name, call in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
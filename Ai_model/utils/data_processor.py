@@ -4,51 +4,264 @@ Data processing utilities for crop prediction and profit forecasting.
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from functools import lru_cache
+from math import sin, cos, pi
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Any, Tuple, Optional, Union
 from datetime import datetime, timedelta
 from sklearn.preprocessing import MinMaxScaler
 import statsmodels.api as sm
 
+# Polars is optional; without it every pipeline runs on pandas
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Weather and market analysis fields used as model features, in column order
+WEATHER_FEATURES = ['weather_score', 'temperature', 'humidity', 'rainfall']
+MARKET_FEATURES = ['current_price', 'avg_price', 'min_price', 'max_price',
+                   'price_volatility', 'price_trend']
+
+def linear_slope(y: np.ndarray) -> float:
+    """
+    Least-squares slope of a series against its index.
+    
+    Closed form of np.polyfit(range(n), y, 1)[0], using
+    sum((x - x_mean)^2) = n(n^2 - 1)/12 for x = 0..n-1.
+    
+    Args:
+        y: 1-D series
+        
+    Returns:
+        Slope per step (0.0 for fewer than two points)
+    """
+    n = y.size
+    if n < 2:
+        return 0.0
+    x_mean = (n - 1) / 2.0
+    num = ((np.arange(n) - x_mean) * (y - y.mean())).sum()
+    den = n * (n * n - 1) / 12.0
+    return float(num / den)
+
+# The simple heat index, hi = 0.5 * (F + 61 + 1.2 * (F - 68) + 0.094 * h) with
+# F = C * 9/5 + 32 and the result converted back to Celsius, is linear in both
+# inputs; these are its Celsius coefficients, derived once from the formula
+_HEAT_INDEX_TEMP = 0.5 * (1 + 1.2) * 9 / 5 * 5 / 9
+_HEAT_INDEX_HUMIDITY = 0.5 * 0.094 * 5 / 9
+_HEAT_INDEX_CONST = (0.5 * (32 * (1 + 1.2) + 61 - 1.2 * 68) - 32) * 5 / 9
+
+def _heat_index(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    """Simple heat index (Celsius) from temperature (Celsius) and relative humidity (%)."""
+    hi = temperature * _HEAT_INDEX_TEMP
+    hi += humidity * _HEAT_INDEX_HUMIDITY
+    hi += _HEAT_INDEX_CONST
+    return hi
+
+def _backfill_window(column: np.ndarray, window: int) -> None:
+    """Back-fill the first window - 1 rows of a column from its first full window."""
+    if len(column) < window:
+        column[:] = np.nan
+    else:
+        column[:window - 1] = column[window - 1]
+
+@lru_cache(maxsize=512)
+def _seasonal(month: int, day: int) -> Tuple[float, float, float, float]:
+    """Return the (month_sin, month_cos, day_sin, day_cos) cyclical features of a date."""
+    month_angle = 2 * pi * month / 12.0
+    day_angle = 2 * pi * day / 31.0
+    return sin(month_angle), cos(month_angle), sin(day_angle), cos(day_angle)
+
+def _tech_indicators(prices: np.ndarray, demand: float, supply: float) -> np.ndarray:
+    """
+    Compute all price features straight into one preallocated array.
+    
+    Args:
+        prices: Price series in date order
+        demand: Demand index, repeated on every row
+        supply: Supply index, repeated on every row
+        
+    Returns:
+        Array of shape (len(prices), 7) with price, 7-day MA, 30-day MA,
+        7-day momentum, 14-day volatility, demand and supply
+    """
+    n = len(prices)
+    out = np.empty((n, 7), dtype=np.float64)
+    out[:, 0] = prices
+    
+    # Running sums give every window sum as a difference of two entries
+    sums = np.zeros(n + 1)
+    np.cumsum(prices, out=sums[1:])
+    
+    # Moving averages, written straight into their columns
+    for col, window in ((1, 7), (2, 30)):
+        column = out[:, col]
+        np.subtract(sums[window:], sums[:-window], out=column[window - 1:])
+        column[window - 1:] /= window
+        _backfill_window(column, window)
+    
+    # Price momentum
+    out[:7, 3] = 0
+    np.subtract(prices[7:], prices[:-7], out=out[7:, 3])
+    
+    # Volatility (sample standard deviation over 14 days), taken over strided
+    # window views rather than running sums of squares, which lose precision
+    column = out[:, 4]
+    if n >= 14:
+        sliding_window_view(prices, 14).std(axis=1, ddof=1, out=column[13:])
+    _backfill_window(column, 14)
+    
+    out[:, 5] = demand
+    out[:, 6] = supply
+    return out
+
+def _clean_weather_polars(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Fill and outlier-filter weather columns with polars' multi-threaded engine."""
+    frame = pl.from_pandas(df)
+    fills = [pl.col(c).fill_null(0.0 if c == 'rainfall' else pl.col(c).mean()) for c in columns]
+    within = [(pl.col(c) - pl.col(c).mean()).abs() <= 3 * pl.col(c).std() for c in columns]
+    return frame.with_columns(fills).filter(pl.all_horizontal(within)).to_pandas()
+
+def _historical_features_polars(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute per-crop price features with polars window expressions."""
+    frame = pl.from_pandas(df).sort(['crop', 'date'], maintain_order=True)
+    price = pl.col('price').cast(pl.Float64)
+    features = frame.select(
+        price,
+        price.rolling_mean(7).fill_null(strategy='backward').over('crop').alias('ma7'),
+        price.rolling_mean(30).fill_null(strategy='backward').over('crop').alias('ma30'),
+        (price - price.shift(7)).fill_null(0.0).over('crop').alias('momentum'),
+        price.rolling_std(14).fill_null(strategy='backward').over('crop').alias('volatility'),
+        pl.col('demand_index').mean().over('crop'),
+        pl.col('supply_index').mean().over('crop')
+    )
+    return features.to_numpy().astype(np.float64), frame['price'].to_numpy()
+
 class DataProcessor:
+    # Ideal ranges (%) for the sand, silt and clay content of the soil
+    _TEXTURE_COMPONENTS = ('sand', 'silt', 'clay')
+    _TEXTURE_MIN = np.array([20.0, 30.0, 10.0])
+    _TEXTURE_MAX = np.array([60.0, 50.0, 30.0])
+    _TEXTURE_MID = (_TEXTURE_MIN + _TEXTURE_MAX) / 2
+    _TEXTURE_SPAN = _TEXTURE_MAX - _TEXTURE_MIN
+    
+    # Drainage contribution of sand, silt and clay
+    _DRAINAGE_WEIGHTS = np.array([1.0, 0.5, 0.2])
+    
+    # Soil quality metrics and their weights in the overall score
+    _SOIL_QUALITY_METRICS = ('ph', 'organic_matter', 'fertility_index', 'texture_score', 'drainage_score')
+    _SOIL_QUALITY_WEIGHTS = np.array([0.15, 0.2, 0.25, 0.2, 0.2])
+    
     def __init__(self):
         """Initialize data processor with scalers."""
         self.price_scaler = MinMaxScaler()
         self.feature_scalers = {}
+        
+        # Per-feature minimum and range learned by fit_scaler
+        self._feature_min = None
+        self._feature_range = None
     
-    def clean_weather_data(self, weather_data: Dict[str, Any]) -> pd.DataFrame:
+    def clean_weather_data(self, weather_data: Dict[str, Any], engine: str = 'pandas') -> pd.DataFrame:
         """
         Clean and process weather data from API.
         
         Args:
             weather_data: Raw weather data from API
+            engine: 'pandas', or 'polars' to run the cleaning multi-threaded
+                (falls back to pandas if polars is not installed)
             
         Returns:
             Processed weather data as DataFrame
         """
-        # Convert to DataFrame
-        df = pd.DataFrame(weather_data)
-        
-        # Handle missing values
-        df = df.fillna({
-            'temperature': df['temperature'].mean(),
-            'humidity': df['humidity'].mean(),
-            'rainfall': 0,
-            'wind_speed': df['wind_speed'].mean() if 'wind_speed' in df else 0,
-            'soil_moisture': df['soil_moisture'].mean() if 'soil_moisture' in df else 0
-        })
-        
-        # Remove outliers
-        for column in ['temperature', 'humidity', 'rainfall', 'wind_speed', 'soil_moisture']:
-            if column in df.columns:
-                mean = df[column].mean()
-                std = df[column].std()
-                df = df[np.abs(df[column] - mean) <= 3 * std]
+        columns = [c for c in ['temperature', 'humidity', 'rainfall', 'wind_speed', 'soil_moisture']
+                   if c in weather_data]
+        if columns and engine == 'polars' and pl is not None:
+            df = _clean_weather_polars(pd.DataFrame(weather_data), columns)
+            if 'temperature' in df and 'humidity' in df:
+                df['heat_index'] = self._calculate_heat_index(df['temperature'], df['humidity'])
+            return df
+        
+        # Work on the raw columns as arrays; a DataFrame is only built for the result
+        data = {name: np.asarray(column) for name, column in weather_data.items()}
+        if columns:
+            values = np.column_stack([np.array(weather_data[c], dtype=np.float64) for c in columns])
+            
+            # Handle missing values: column means, except no reading means no rain
+            fill = np.nanmean(values, axis=0)
+            if 'rainfall' in columns:
+                fill[columns.index('rainfall')] = 0.0
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = fill[np.nonzero(missing)[1]]
+            
+            # Remove outliers with one combined mask, using statistics computed once
+            mask = (np.abs(values - values.mean(axis=0)) <= 3 * values.std(axis=0, ddof=1)).all(axis=1)
+            data = {name: column[mask] for name, column in data.items()}
+            data.update(zip(columns, values[mask].T))
         
         # Add derived features
-        if 'temperature' in df and 'humidity' in df:
-            df['heat_index'] = self._calculate_heat_index(df['temperature'], df['humidity'])
+        if 'temperature' in data and 'humidity' in data:
+            data['heat_index'] = _heat_index(np.asarray(data['temperature'], dtype=np.float64),
+                                             np.asarray(data['humidity'], dtype=np.float64))
+        
+        return pd.DataFrame(data)
+
+    def process_weather_data(self, weather_data: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Reduce current weather from the API to numeric model features.
+        
+        Args:
+            weather_data: Current weather data from WeatherAPI
+            
+        Returns:
+            Dictionary of WEATHER_FEATURES values (missing readings are NaN,
+            a missing weather score defaults to 0.8)
+        """
+        processed = {}
+        for feature in WEATHER_FEATURES:
+            value = weather_data.get(feature)
+            processed[feature] = float(value) if value is not None else np.nan
+        if np.isnan(processed['weather_score']):
+            processed['weather_score'] = 0.8
+        return processed
+
+    def weather_to_features(self, weather_data: Dict[str, Any]) -> np.ndarray:
+        """
+        Convert processed weather data to a feature array.
         
-        return df
+        Args:
+            weather_data: Processed weather data
+            
+        Returns:
+            Array of WEATHER_FEATURES values (NaN where missing)
+        """
+        return np.array([weather_data.get(f, np.nan) for f in WEATHER_FEATURES], dtype=np.float64)
+
+    def market_to_features(self, market_analysis: Dict[str, Any]) -> np.ndarray:
+        """
+        Convert a market analysis to a feature array.
+        
+        Args:
+            market_analysis: Market analysis for one crop
+            
+        Returns:
+            Array of MARKET_FEATURES values (NaN where missing)
+        """
+        return np.array([market_analysis.get(f, np.nan) for f in MARKET_FEATURES], dtype=np.float64)
+
+    def combine_features(self, weather_features: np.ndarray,
+                         market_analysis: Dict[str, Any]) -> np.ndarray:
+        """
+        Combine weather features and a market analysis into one feature row.
+        
+        Args:
+            weather_features: Array from weather_to_features
+            market_analysis: Market analysis for one crop
+            
+        Returns:
+            1-D array of weather features followed by MARKET_FEATURES
+        """
+        return np.concatenate([weather_features, self.market_to_features(market_analysis)])
 
     def process_soil_data(self, soil_data: Dict[str, Any], farm_size: float = 1.0) -> Dict[str, float]:
         """
@@ -80,22 +293,13 @@ class DataProcessor:
         Returns:
             Soil texture score (0-1)
         """
-        # Ideal ranges for different soil components
-        ideal_ranges = {
-            'sand': (20, 60),
-            'silt': (30, 50),
-            'clay': (10, 30)
-        }
+        # Percentages of sand, silt and clay against their ideal ranges
+        values = np.array([composition.get(component, 0) for component in self._TEXTURE_COMPONENTS]) * 100
+        in_range = (values >= self._TEXTURE_MIN) & (values <= self._TEXTURE_MAX)
+        distance = np.abs(values - self._TEXTURE_MID) / self._TEXTURE_SPAN
+        scores = np.where(in_range, 1.0, np.maximum(0, 1 - distance))
         
-        score = 0
-        for component, (min_val, max_val) in ideal_ranges.items():
-            value = composition.get(component, 0) * 100  # Convert to percentage
-            if min_val <= value <= max_val:
-                score += 1
-            else:
-                score += max(0, 1 - abs(value - (min_val + max_val) / 2) / (max_val - min_val))
-                
-        return score / len(ideal_ranges)
+        return float(scores.mean())
         
     def _calculate_drainage_score(self, composition: Dict[str, float]) -> float:
         """
@@ -108,27 +312,16 @@ class DataProcessor:
             Drainage score (0-1)
         """
         # Sand has best drainage, clay has worst
-        return (composition['sand'] * 1.0 + 
-                composition['silt'] * 0.5 + 
-                composition['clay'] * 0.2)
+        values = np.array([composition[component] for component in self._TEXTURE_COMPONENTS])
+        return float(values @ self._DRAINAGE_WEIGHTS)
         
     def _calculate_soil_quality_score(self, soil_data: Dict[str, float]) -> float:
         """Calculate overall soil quality score."""
-        weights = {
-            'ph': 0.15,
-            'organic_matter': 0.2,
-            'fertility_index': 0.25,
-            'texture_score': 0.2,
-            'drainage_score': 0.2
-        }
-        
-        score = 0
-        for metric, weight in weights.items():
-            if metric in soil_data:
-                normalized_value = min(1.0, max(0.0, soil_data[metric] / 10.0))
-                score += normalized_value * weight
-                
-        return score
+        # Metrics are scaled to [0, 1]; missing ones contribute nothing
+        values = np.array([soil_data.get(metric, np.nan) for metric in self._SOIL_QUALITY_METRICS],
+                          dtype=np.float64)
+        normalized = np.clip(values / 10.0, 0.0, 1.0)
+        return float(np.nansum(normalized * self._SOIL_QUALITY_WEIGHTS))
 
     def prepare_prediction_features(self, 
                                 weather_data: pd.DataFrame,
@@ -147,14 +340,12 @@ class DataProcessor:
         Returns:
             Dictionary containing feature matrices for both models
         """
-        # Weather features with advanced metrics
-        weather_features = {
-            'temperature': weather_data['temperature'].mean(),
-            'humidity': weather_data['humidity'].mean(),
-            'rainfall': weather_data['rainfall'].mean(),
-            'heat_index': weather_data['heat_index'].mean() if 'heat_index' in weather_data else 0,
-            'soil_moisture': weather_data['soil_moisture'].mean() if 'soil_moisture' in weather_data else 0
-        }
+        # Weather features with advanced metrics, averaged in one reduction
+        columns = ['temperature', 'humidity', 'rainfall', 'heat_index', 'soil_moisture']
+        present = [c for c in columns if c in weather_data]
+        means = np.nanmean(weather_data[present].to_numpy(dtype=np.float64), axis=0)
+        present_means = dict(zip(present, means))
+        weather_features = {c: present_means.get(c, 0) for c in columns}
         
         # Market features with trend analysis
         market_features = {
@@ -192,9 +383,7 @@ class DataProcessor:
             return 0.0
             
         # Calculate trend using simple linear regression
-        x = np.arange(len(prices))
-        y = np.array(prices)
-        slope = np.polyfit(x, y, 1)[0]
+        slope = linear_slope(np.asarray(prices, dtype=np.float64))
         
         # Normalize trend to [-1, 1] range
         return np.tanh(slope)
@@ -202,51 +391,42 @@ class DataProcessor:
     def _get_seasonal_factor(self, date: datetime) -> float:
         """Calculate seasonal factor for crop suitability."""
         # Convert month to seasonal factor using sine wave
-        return np.sin(2 * np.pi * (date.month / 12.0))
+        return _seasonal(date.month, date.day)[0]
         
     def _prepare_price_features(self, historical_prices: pd.DataFrame, 
                               market_features: Dict[str, float]) -> np.ndarray:
         """Prepare features for price prediction."""
-        # Calculate technical indicators
-        prices = historical_prices['price'].values
-        
-        features = []
-        
-        # Moving averages
-        ma_7 = pd.Series(prices).rolling(7).mean().fillna(method='bfill')
-        ma_30 = pd.Series(prices).rolling(30).mean().fillna(method='bfill')
-        
-        # Price momentum
-        momentum = prices - np.roll(prices, 7)
-        momentum[0:7] = 0
-        
-        # Volatility
-        volatility = pd.Series(prices).rolling(14).std().fillna(method='bfill')
-        
-        # Combine all features
-        features = np.column_stack([
-            prices,
-            ma_7,
-            ma_30,
-            momentum,
-            volatility,
-            np.full_like(prices, market_features['demand_index']),
-            np.full_like(prices, market_features['supply_index'])
-        ])
-        
-        return features
+        return _tech_indicators(
+            historical_prices['price'].to_numpy(dtype=np.float64),
+            market_features['demand_index'],
+            market_features['supply_index']
+        )
 
-    @staticmethod
-    def normalize_features(features: np.ndarray) -> np.ndarray:
+    def fit_scaler(self, features: np.ndarray) -> None:
+        """
+        Learn the per-feature range used by normalize_features.
+        
+        Args:
+            features: Training feature matrix
+        """
+        self._feature_min = features.min(axis=0)
+        self._feature_range = features.max(axis=0) - self._feature_min + 1e-10
+
+    def normalize_features(self, features: np.ndarray) -> np.ndarray:
         """
         Normalize feature values to [0,1] range.
         
+        Uses the range learned by fit_scaler when available, otherwise the
+        range of the given features.
+        
         Args:
             features: Raw feature matrix
             
         Returns:
             Normalized feature matrix
         """
+        if self._feature_min is not None:
+            return (features - self._feature_min) / self._feature_range
         min_vals = features.min(axis=0)
         max_vals = features.max(axis=0)
         normalized = (features - min_vals) / (max_vals - min_vals + 1e-10)
@@ -268,48 +448,52 @@ class DataProcessor:
         if not all(col in data.columns for col in required_columns):
             return False
         
-        # Check for invalid values
-        if data.isnull().any().any():
-            return False
+        # Check for invalid values, stopping at the first column with a null
+        for _, column in data.items():
+            if column.hasnans:
+                return False
         
         return True
 
-    def prepare_historical_data(self, historical_data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_historical_data(self, historical_data: pd.DataFrame,
+                                engine: str = 'pandas') -> Tuple[np.ndarray, np.ndarray]:
         """
         Prepare historical data for model training.
         
         Args:
             historical_data: DataFrame with historical crop and market data
+            engine: 'pandas', or 'polars' to compute the features multi-threaded
+                (falls back to pandas if polars is not installed)
             
         Returns:
             Tuple of (features, target_prices)
         """
-        # Sort by date
-        historical_data = historical_data.sort_values('date')
-        
-        # Calculate technical indicators
-        features = []
-        for crop in historical_data['crop'].unique():
-            crop_data = historical_data[historical_data['crop'] == crop]
-            
-            # Calculate features for this crop
-            crop_features = self._prepare_price_features(
-                crop_data[['price']],
-                {
-                    'demand_index': crop_data['demand_index'].mean(),
-                    'supply_index': crop_data['supply_index'].mean()
-                }
+        if engine == 'polars' and pl is not None:
+            return _historical_features_polars(historical_data)
+        
+        # Sort by crop, then date, so each crop's rows are one contiguous block
+        historical_data = historical_data.sort_values(['crop', 'date'], kind='stable')
+        
+        # Calculate technical indicators for each crop straight into one array
+        X = np.empty((len(historical_data), 7), dtype=np.float64)
+        start = 0
+        # Rows without a crop form their own (last) group, so every row of X is filled
+        for _, crop_data in historical_data.groupby('crop', sort=False, dropna=False):
+            end = start + len(crop_data)
+            X[start:end] = _tech_indicators(
+                crop_data['price'].to_numpy(dtype=np.float64),
+                crop_data['demand_index'].mean(),
+                crop_data['supply_index'].mean()
             )
-            
-            features.append(crop_features)
+            start = end
         
-        # Combine all features
-        X = np.concatenate(features, axis=0)
-        y = historical_data['price'].values
+        # Targets in the same row order as the features
+        y = historical_data['price'].to_numpy()
         
         return X, y
         
-    def _calculate_heat_index(self, temperature: pd.Series, humidity: pd.Series) -> pd.Series:
+    def _calculate_heat_index(self, temperature: Union[pd.Series, np.ndarray, float],
+                              humidity: Union[pd.Series, np.ndarray, float]) -> Union[pd.Series, np.ndarray, float]:
         """
         Calculate heat index from temperature and humidity.
         
@@ -318,16 +502,9 @@ class DataProcessor:
             humidity: Relative humidity (%)
             
         Returns:
-            Heat index values
+            Heat index values, of the same type as the inputs
         """
-        # Convert Celsius to Fahrenheit for the standard heat index formula
-        temp_f = temperature * 9/5 + 32
-        
-        # Simple heat index formula
-        hi = 0.5 * (temp_f + 61.0 + ((temp_f - 68.0) * 1.2) + (humidity * 0.094))
-        
-        # Convert back to Celsius
-        return (hi - 32) * 5/9
+        return _heat_index(temperature, humidity)
 
     def extract_seasonal_features(self, date: datetime) -> Dict[str, float]:
         """
@@ -347,11 +524,12 @@ class DataProcessor:
         }
         
         # Add cyclical features
+        month_sin, month_cos, day_sin, day_cos = _seasonal(date.month, date.day)
         features.update({
-            'month_sin': np.sin(2 * np.pi * date.month / 12.0),
-            'month_cos': np.cos(2 * np.pi * date.month / 12.0),
-            'day_sin': np.sin(2 * np.pi * date.day / 31.0),
-            'day_cos': np.cos(2 * np.pi * date.day / 31.0)
+            'month_sin': month_sin,
+            'month_cos': month_cos,
+            'day_sin': day_sin,
+            'day_cos': day_cos
         })
         
         return features
\ No newline at end of file
@@ -7,6 +7,11 @@ from datetime import datetime, timedelta
 import numpy as np
 from scipy.stats import norm
 import pandas as pd
+from utils.data_processor import linear_slope
+
+# Lower-tail z-scores for the usual VaR confidence levels, so risk metrics
+# don't pay for a SciPy call on every crop
+_NORM_PPF = {level: float(norm.ppf(1 - level)) for level in (0.90, 0.95, 0.99)}
 
 class ProfitCalculator:
     def __init__(self):
@@ -153,6 +158,65 @@ class ProfitCalculator:
             'risk_factor': risk_factor
         }
 
+    def analyze_profitability_batch(self, crop_names: List[str], areas: Any,
+                                    market_data: List[Dict[str, Any]],
+                                    conditions: List[Dict[str, Any]],
+                                    input_costs: List[Dict[str, float]]) -> Dict[str, np.ndarray]:
+        """
+        Perform profitability analysis for several crops at once.
+        
+        Equivalent to calling analyze_profitability for each crop, but the
+        inputs are gathered into arrays and every metric is computed with a
+        few vector operations.
+        
+        Args:
+            crop_names: Names of the crops
+            areas: Cultivation area in hectares, one per crop or shared
+            market_data: Market price and trend data, one per crop
+            conditions: Growing conditions data, one per crop
+            input_costs: Production input costs, one per crop
+            
+        Returns:
+            Dictionary of profitability metric arrays, in crop order
+        """
+        n = len(crop_names)
+        areas = np.broadcast_to(np.asarray(areas, dtype=np.float64), (n,))
+        
+        # Input costs as a (crops, cost factors) matrix against the factor weights
+        factors = {factor: j for j, factor in enumerate(self.cost_factors)}
+        costs = np.zeros((n, len(factors)))
+        for i, crop_costs in enumerate(input_costs):
+            for factor, cost in crop_costs.items():
+                costs[i, factors[factor]] = cost
+        total_cost = (costs @ np.fromiter(self.cost_factors.values(), dtype=np.float64, count=len(factors))) * areas
+        
+        # Base yield and its weather, soil and management modifiers
+        modifiers = np.array([
+            (c.get('base_yield', 0), c.get('weather_quality', 1.0),
+             c.get('soil_quality', 1.0), c.get('management_efficiency', 1.0))
+            for c in conditions
+        ], dtype=np.float64).reshape(n, 4)
+        estimated_yield = modifiers.prod(axis=1) * areas
+        
+        market = np.array([
+            (m.get('price_per_ton', 0), m.get('risk_factor', 0.1)) for m in market_data
+        ], dtype=np.float64).reshape(n, 2)
+        revenue = estimated_yield * market[:, 0]
+        risk_factor = market[:, 1]
+        profit = (revenue - total_cost) * (1 - risk_factor)
+        
+        roi = np.zeros(n)
+        np.divide(profit, total_cost, out=roi, where=total_cost > 0)
+        
+        return {
+            'total_cost': total_cost,
+            'estimated_yield': estimated_yield,
+            'expected_revenue': revenue,
+            'projected_profit': profit,
+            'roi': roi,
+            'risk_factor': risk_factor
+        }
+
     def calculate_break_even_price(self, total_cost: float, 
                                  estimated_yield: float) -> float:
         """
@@ -185,29 +249,24 @@ class ProfitCalculator:
             List of forecasted prices
         """
         # Calculate historical trend
-        historical_trend = np.polyfit(range(len(historical_prices)), historical_prices, 1)[0]
+        historical_trend = linear_slope(np.asarray(historical_prices, dtype=np.float64))
         
         # Calculate seasonal component
         seasonal_component = np.mean(seasonal_factors)
         
         # Calculate market sentiment score
-        sentiment_score = sum(score * weight for score, weight in market_indicators.items())
-        
-        # Generate forecast
-        forecasts = []
-        last_price = historical_prices[-1]
-        
-        for period in range(forecast_period):
-            forecast = (
-                last_price +
-                (historical_trend * self.price_weights['historical_trend']) +
-                (seasonal_component * self.price_weights['seasonal_factor']) +
-                (sentiment_score * self.price_weights['market_sentiment'])
-            )
-            forecasts.append(max(0, forecast))  # Ensure non-negative prices
-            last_price = forecast
-            
-        return forecasts
+        sentiment_score = sum(market_indicators.values())
+        
+        # Every period adds the same weighted change, so the forecast is a
+        # straight line from the last price
+        delta = (
+            (historical_trend * self.price_weights['historical_trend']) +
+            (seasonal_component * self.price_weights['seasonal_factor']) +
+            (sentiment_score * self.price_weights['market_sentiment'])
+        )
+        forecasts = historical_prices[-1] + delta * np.arange(1, forecast_period + 1)
+        
+        return np.maximum(0, forecasts).tolist()  # Ensure non-negative prices
 
     def calculate_risk_adjusted_metrics(self,
                                      investment: float,
@@ -233,15 +292,19 @@ class ProfitCalculator:
         }
         
         # Calculate basic metrics
-        expected_revenue = np.mean(revenue_forecast)
-        revenue_std = np.std(revenue_forecast)
+        revenue = np.asarray(revenue_forecast, dtype=np.float64)
+        expected_revenue = revenue.mean()
+        revenue_std = revenue.std()
         
         # Adjust for risk level
         risk_multiplier = risk_multipliers.get(risk_level.lower(), 1.0)
         total_risk = sum(self.risk_factors.values()) * risk_multiplier
         
         # Calculate Value at Risk (VaR)
-        var = norm.ppf(1 - confidence_level) * revenue_std
+        z_score = _NORM_PPF.get(confidence_level)
+        if z_score is None:
+            z_score = norm.ppf(1 - confidence_level)
+        var = z_score * revenue_std
         
         # Calculate risk-adjusted ROI
         base_roi = ((expected_revenue - investment) / investment) * 100 if investment > 0 else 0
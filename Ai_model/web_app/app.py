@@ -4,29 +4,79 @@ Web application for crop prediction service.
 
 import sys
 import os
+import threading
 # Add the project root directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, jsonify
-from models.crop_prediction_model import CropPredictionModel
+from flask import Flask, Response, render_template, request, jsonify
+from models.crop_prediction_model import CropPredictionModel, prediction_to_json
 from models.crop_database import CropDatabase
 from utils.data_processor import DataProcessor
 from utils.profit_calculator import ProfitCalculator
 from api.weather_api import WeatherAPI
 from api.market_api import MarketAPI
+from config import SUPPORTED_CROPS
 import numpy as np
 
+# Simple crop recommendation by soil type: (crop, suitability)
+_SOIL_TO_CROP = {
+    'clay': ('Rice', 0.9),
+    'loamy': ('Wheat', 0.85),
+    'sandy': ('Corn', 0.8)
+}
+_DEFAULT_CROP = ('Wheat', 0.7)
+
+# Sample per-hectare yield, cost, revenue and profit, and the sample ROI (%)
+_PROFITABILITY_FIELDS = ('estimated_yield', 'total_cost', 'expected_revenue', 'projected_profit')
+_PROFITABILITY_PER_HECTARE = np.array([5.0, 2000.0, 3000.0, 1000.0])
+_SAMPLE_ROI = 50.0
+
+def _sample_profitability(area: float) -> dict:
+    """
+    Scale the sample profitability figures to a farm's area.
+    
+    Args:
+        area: Farm area in hectares
+        
+    Returns:
+        Dictionary of sample profitability figures
+    """
+    profitability = dict(zip(_PROFITABILITY_FIELDS, (_PROFITABILITY_PER_HECTARE * area).tolist()))
+    profitability['roi'] = _SAMPLE_ROI
+    return profitability
+
+# Model, database and API clients, built once per process and shared by every app
+_components = None
+_components_lock = threading.Lock()
+
+def _get_components() -> tuple:
+    """
+    Build the application components on first use and reuse them afterwards.
+    
+    Returns:
+        Tuple of (model, crop database, weather API, market API,
+        data processor, profit calculator)
+    """
+    global _components
+    if _components is None:
+        with _components_lock:
+            if _components is None:
+                _components = (
+                    CropPredictionModel(),
+                    CropDatabase(),
+                    WeatherAPI(),
+                    MarketAPI(),
+                    DataProcessor(),
+                    ProfitCalculator()
+                )
+    return _components
+
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
     
-    # Initialize components
-    model = CropPredictionModel()
-    crop_db = CropDatabase()
-    weather_api = WeatherAPI()
-    market_api = MarketAPI()
-    data_processor = DataProcessor()
-    profit_calc = ProfitCalculator()
+    # Initialize components (warmed up here, before the first request)
+    model, crop_db, weather_api, market_api, data_processor, profit_calc = _get_components()
 
     @app.route('/')
     def home():
@@ -38,34 +88,15 @@ def create_app():
         """Handle crop prediction requests."""
         try:
             data = request.get_json()
-            print("Received prediction request with data:", data)
+            app.logger.debug("Received prediction request with data: %s", data)
             
             # Extract soil data
             soil_data = data.get('soil_data', {})
             soil_type = soil_data.get('soil_type', 'loamy')
-            # Simple crop recommendation based on soil type
-            if soil_type == 'clay':
-                recommended_crop = "Rice"
-                suitability = 0.9
-            elif soil_type == 'loamy':
-                recommended_crop = "Wheat"
-                suitability = 0.85
-            elif soil_type == 'sandy':
-                recommended_crop = "Corn"
-                suitability = 0.8
-            else:
-                recommended_crop = "Wheat"
-                suitability = 0.7
+            recommended_crop, suitability = _SOIL_TO_CROP.get(soil_type, _DEFAULT_CROP)
                 
             # Calculate sample profitability
-            area = float(data.get('area', 1.0))
-            profitability = {
-                'estimated_yield': 5.0 * area,
-                'total_cost': 2000 * area,
-                'expected_revenue': 3000 * area,
-                'projected_profit': 1000 * area,
-                'roi': 50.0
-            }
+            profitability = _sample_profitability(float(data.get('area', 1.0)))
             
             return jsonify({
                 'recommended_crop': recommended_crop,
@@ -92,6 +123,26 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/comprehensive', methods=['POST'])
+    def comprehensive_prediction():
+        """Handle comprehensive weather, market and profit prediction requests."""
+        try:
+            data = request.get_json()
+            prediction = model.get_comprehensive_prediction(
+                city=data['city'],
+                state=data['state'],
+                district=data['district'],
+                crops=data.get('crops', SUPPORTED_CROPS),
+                farm_size=float(data.get('farm_size', 1.0)),
+                soil_type=data.get('soil_type', 'loamy')
+            )
+            
+            # The prediction holds NumPy arrays and scalars, which jsonify cannot encode
+            return Response(prediction_to_json(prediction), mimetype='application/json')
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/crops', methods=['GET'])
     def get_crops():
         """Get list of all available crops."""